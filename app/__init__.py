@@ -1,6 +1,10 @@
 from flask import Flask
 from app.config import load_configurations, configure_logging
 from .views import webhook_blueprint
+from .services.webhook_queue import PartitionedWorkQueue
+from .services.dedup import MessageDeduplicator
+from .services.metrics import webhook_queue_depth, webhook_queue_capacity
+from .utils.whatsapp_utils import process_message
 
 
 def create_app():
@@ -13,4 +17,22 @@ def create_app():
     # Import and register blueprints, if any
     app.register_blueprint(webhook_blueprint)
 
+    # Webhook messages are acknowledged at once and handled by per-user ordered workers
+    webhook_queue = PartitionedWorkQueue(
+        process_message,
+        partitions=app.config["WEBHOOK_WORKERS"],
+        maxsize=app.config["WEBHOOK_QUEUE_SIZE"],
+        context=app.app_context,
+    )
+    app.extensions["webhook_queue"] = webhook_queue
+    webhook_queue_depth.function = webhook_queue.depth
+    webhook_queue_capacity.set(webhook_queue.partition_size * webhook_queue.partitions)
+
+    # Meta redelivers on timeouts; message ids already seen are acknowledged and dropped
+    app.extensions["webhook_dedup"] = MessageDeduplicator(
+        ttl=app.config["WEBHOOK_DEDUP_TTL"],
+        maxsize=app.config["WEBHOOK_DEDUP_SIZE"],
+        path=app.config["WEBHOOK_DEDUP_DB"],
+    )
+
     return app
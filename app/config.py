@@ -14,6 +14,11 @@ def load_configurations(app):
     app.config["VERSION"] = os.getenv("VERSION")
     app.config["PHONE_NUMBER_ID"] = os.getenv("PHONE_NUMBER_ID")
     app.config["VERIFY_TOKEN"] = os.getenv("VERIFY_TOKEN")
+    app.config["WEBHOOK_WORKERS"] = int(os.getenv("WEBHOOK_WORKERS", 8))
+    app.config["WEBHOOK_QUEUE_SIZE"] = int(os.getenv("WEBHOOK_QUEUE_SIZE", 1000))
+    app.config["WEBHOOK_DEDUP_TTL"] = int(os.getenv("WEBHOOK_DEDUP_TTL", 24 * 3600))
+    app.config["WEBHOOK_DEDUP_SIZE"] = int(os.getenv("WEBHOOK_DEDUP_SIZE", 100_000))
+    app.config["WEBHOOK_DEDUP_DB"] = os.getenv("WEBHOOK_DEDUP_DB")  # Optional SQLite file
 
 
 def configure_logging():
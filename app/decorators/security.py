@@ -1,20 +1,27 @@
-from functools import wraps
+from functools import lru_cache, wraps
 from flask import current_app, jsonify, request
 import logging
 import hashlib
 import hmac
 
 
+@lru_cache(maxsize=4)
+def _keyed_hmac(secret):
+    # Keyed once per secret; each request copies this state instead of re-deriving the key pads
+    return hmac.new(bytes(secret, "latin-1"), digestmod=hashlib.sha256)
+
+
 def validate_signature(payload, signature):
     """
-    Validate the incoming payload's signature against our expected signature
+    Validate the incoming payload's signature against our expected signature.
+    `payload` is the raw request body; bytes are hashed as-is, without decoding.
     """
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
     # Use the App Secret to hash the payload
-    expected_signature = hmac.new(
-        bytes(current_app.config["APP_SECRET"], "latin-1"),
-        msg=payload.encode("utf-8"),
-        digestmod=hashlib.sha256,
-    ).hexdigest()
+    mac = _keyed_hmac(current_app.config["APP_SECRET"]).copy()
+    mac.update(payload)
+    expected_signature = mac.hexdigest()
 
     # Check if the signature matches
     return hmac.compare_digest(expected_signature, signature)
@@ -30,7 +37,7 @@ def signature_required(f):
         signature = request.headers.get("X-Hub-Signature-256", "")[
             7:
         ]  # Removing 'sha256='
-        if not validate_signature(request.data.decode("utf-8"), signature):
+        if not validate_signature(request.get_data(), signature):
             logging.info("Signature verification failed!")
             return jsonify({"status": "error", "message": "Invalid signature"}), 403
         return f(*args, **kwargs)
@@ -0,0 +1,82 @@
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+PURGE_EVERY = 1000  # Expired rows are deleted from the backing table every this many writes
+
+
+class MessageDeduplicator:
+    """
+    Remembers recently seen WhatsApp message ids so redelivered webhooks are
+    handled once.
+
+    Ids live in an insertion-ordered dict capped at `maxsize` entries, each
+    expiring `ttl` seconds after it was first seen; lookups are O(1) and the
+    oldest ids are evicted first. With `path`, ids are also written to a small
+    SQLite table so they survive a restart.
+    """
+
+    def __init__(self, ttl=24 * 3600, maxsize=100_000, path=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._expiry = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._writes = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS seen_messages (id TEXT PRIMARY KEY, expires REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS seen_messages_expires ON seen_messages (expires)")
+            self._load()
+
+    def _load(self):
+        now = time.time()
+        self._db.execute("DELETE FROM seen_messages WHERE expires <= ?", (now,))
+        rows = self._db.execute(
+            "SELECT id, expires FROM seen_messages ORDER BY expires DESC LIMIT ?", (self.maxsize,)
+        ).fetchall()
+        for message_id, expires in reversed(rows):
+            self._expiry[message_id] = expires
+        logging.info(f"Loaded {len(rows)} seen message ids.")
+
+    def _evict(self, now):
+        # Entries are ordered by first sight and share one ttl, so expired ids are at the front
+        while self._expiry:
+            message_id, expires = next(iter(self._expiry.items()))
+            if expires > now and len(self._expiry) <= self.maxsize:
+                break
+            self._expiry.popitem(last=False)
+
+    def claim(self, message_id):
+        """Marks `message_id` as seen. Returns False if it was already seen and has not expired."""
+        if not message_id:
+            return True
+        now = time.time()
+        with self._lock:
+            expires = self._expiry.get(message_id)
+            if expires is not None and expires > now:
+                return False
+            self._expiry.pop(message_id, None)
+            self._expiry[message_id] = now + self.ttl
+            self._evict(now)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO seen_messages VALUES (?, ?)", (message_id, now + self.ttl))
+                self._writes += 1
+                if self._writes % PURGE_EVERY == 0:
+                    self._db.execute("DELETE FROM seen_messages WHERE expires <= ?", (now,))
+        return True
+
+    def release(self, message_id):
+        """Forgets `message_id`, e.g. when it was claimed but could not be queued."""
+        if not message_id:
+            return
+        with self._lock:
+            self._expiry.pop(message_id, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM seen_messages WHERE id = ?", (message_id,))
+
+    def __len__(self):
+        return len(self._expiry)
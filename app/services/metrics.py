@@ -0,0 +1,177 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Seconds; spans sub-millisecond webhook handling up to multi-minute pipeline runs
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_label_text(self.labelnames, key)} {value}" for key, value in sorted(values.items())]
+
+
+class Gauge(_Metric):
+    """Gauge read at scrape time from `function`, or set explicitly."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+        self._values = {}
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _samples(self):
+        if self.function is not None:
+            return [f"{self.name} {self.function()}"]
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_label_text(self.labelnames, key)} {value}" for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def totals(self, **labels):
+        """(count, sum) of the observations with these labels so far."""
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return (series[-1], series[-2]) if series else (0, 0.0)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        lines = []
+        names = self.labelnames + ("le",)
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_label_text(names, key + (repr(float(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_label_text(names, key + ('+Inf',))} {values[-1]}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {values[-2]}")
+            lines.append(f"{self.name}_count{labels} {values[-1]}")
+        return lines
+
+
+class Registry:
+    """Named metrics rendered together in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self._register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = Registry()
+
+pipeline_stage_seconds = registry.histogram(
+    "pipeline_stage_seconds", "Duration of each processing_data stage.", ["stage"])
+pipeline_market_stage_seconds = registry.histogram(
+    "pipeline_market_stage_seconds", "Per-market analysis stage duration.", ["market", "stage"])
+pipeline_rows_fetched_total = registry.counter(
+    "pipeline_rows_fetched_total", "Candles returned by the fetch stage.", ["market"])
+sheet_rows_appended_total = registry.counter(
+    "sheet_rows_appended_total", "Rows appended to the Google Sheet.")
+whatsapp_send_seconds = registry.histogram(
+    "whatsapp_send_seconds", "Outbound Graph API send latency, including retries.", ["path"])
+whatsapp_send_total = registry.counter(
+    "whatsapp_send_total", "Outbound Graph API sends by final HTTP status (0 = network error).", ["path", "status"])
+webhook_request_seconds = registry.histogram(
+    "webhook_request_seconds", "Webhook POST handling latency.", ["kind"])
+webhook_messages_total = registry.counter(
+    "webhook_messages_total", "Webhook messages by outcome.", ["outcome"])
+# Set by create_app; the depth is read from the app's webhook queue at scrape time
+webhook_queue_depth = registry.gauge("webhook_queue_depth", "Messages waiting for a webhook worker.")
+webhook_queue_capacity = registry.gauge("webhook_queue_capacity", "Total webhook queue capacity.")
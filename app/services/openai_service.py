@@ -1,15 +1,22 @@
-from openai import OpenAI
-import shelve
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
+from functools import lru_cache
 import os
 import time
+import asyncio
 import logging
 
+from app.services.thread_store import ThreadStore
+
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_ASSISTANT_ID = os.getenv("OPENAI_ASSISTANT_ID")
 client = OpenAI(api_key=OPENAI_API_KEY)
 
+# Opened once per process; replaces opening the threads_db shelve on every message.
+# Threads from an old threads_db shelve are imported once with `python -m app.services.thread_store`.
+thread_store = ThreadStore(os.getenv("THREAD_STORE_DB", "threads.db"))
+
 
 def upload_file(path):
     # Upload a file with an "assistants" purpose
@@ -32,20 +39,39 @@ def create_assistant(file):
     return assistant
 
 
-# Use context manager to ensure the shelf file is closed properly
 def check_if_thread_exists(wa_id):
-    with shelve.open("threads_db") as threads_shelf:
-        return threads_shelf.get(wa_id, None)
+    return thread_store.get(wa_id)
 
 
 def store_thread(wa_id, thread_id):
-    with shelve.open("threads_db", writeback=True) as threads_shelf:
-        threads_shelf[wa_id] = thread_id
+    # Returns the stored thread id, which is another worker's if it stored one first
+    return thread_store.put(wa_id, thread_id)
+
+
+TERMINAL_RUN_STATUSES = {"completed", "failed", "cancelled", "expired", "incomplete", "requires_action"}
+
+
+class AssistantRunError(Exception):
+    """A run ended in a status other than completed."""
+
+
+def poll_delays(initial=0.1, factor=1.5, maximum=2.0):
+    """Adaptive polling intervals: short runs answer quickly, long runs cost few requests."""
+    delay = initial
+    while True:
+        yield delay
+        delay = min(maximum, delay * factor)
+
+
+@lru_cache(maxsize=None)
+def get_assistant(assistant_id=OPENAI_ASSISTANT_ID):
+    # The assistant definition does not change between messages, so fetch it once
+    return client.beta.assistants.retrieve(assistant_id)
 
 
 def run_assistant(thread, name):
     # Retrieve the Assistant
-    assistant = client.beta.assistants.retrieve(OPENAI_ASSISTANT_ID)
+    assistant = get_assistant()
 
     # Run the assistant
     run = client.beta.threads.runs.create(
@@ -56,13 +82,16 @@ def run_assistant(thread, name):
 
     # Wait for completion
     # https://platform.openai.com/docs/assistants/how-it-works/runs-and-run-steps#:~:text=under%20failed_at.-,Polling%20for%20updates,-In%20order%20to
-    while run.status != "completed":
+    delays = poll_delays()
+    while run.status not in TERMINAL_RUN_STATUSES:
         # Be nice to the API
-        time.sleep(0.5)
+        time.sleep(next(delays))
         run = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
+    if run.status != "completed":
+        raise AssistantRunError(f"Run {run.id} ended with status {run.status}")
 
     # Retrieve the Messages
-    messages = client.beta.threads.messages.list(thread_id=thread.id)
+    messages = client.beta.threads.messages.list(thread_id=thread.id, order="desc", limit=1)
     new_message = messages.data[0].content[0].text.value
     logging.info(f"Generated message: {new_message}")
     return new_message
@@ -76,8 +105,9 @@ def generate_response(message_body, wa_id, name):
     if thread_id is None:
         logging.info(f"Creating new thread for {name} with wa_id {wa_id}")
         thread = client.beta.threads.create()
-        store_thread(wa_id, thread.id)
-        thread_id = thread.id
+        thread_id = store_thread(wa_id, thread.id)
+        if thread_id != thread.id:
+            thread = client.beta.threads.retrieve(thread_id)
 
     # Otherwise, retrieve the existing thread
     else:
@@ -95,3 +125,72 @@ def generate_response(message_body, wa_id, name):
     new_message = run_assistant(thread, name)
 
     return new_message
+
+
+class AsyncAssistant:
+    """
+    Runs the assistant for many conversations concurrently on one event loop.
+
+    The assistant object is fetched once and cached. Runs are polled with
+    adaptive backoff rather than a fixed interval. A run that exceeds
+    `run_timeout` seconds, or whose task is cancelled, is also cancelled on the
+    API side. `client` may be any AsyncOpenAI instance, e.g. one with
+    `base_url` pointing at a local fake of the API.
+    """
+
+    def __init__(self, client=None, assistant_id=OPENAI_ASSISTANT_ID, store=None, run_timeout=60.0,
+                 poll_initial=0.1, poll_factor=1.5, poll_max=2.0):
+        self.client = client or AsyncOpenAI(api_key=OPENAI_API_KEY)
+        self.assistant_id = assistant_id
+        self.store = store or thread_store
+        self.run_timeout = run_timeout
+        self.poll = dict(initial=poll_initial, factor=poll_factor, maximum=poll_max)
+        self._assistant = None
+        self._assistant_lock = asyncio.Lock()
+
+    async def assistant(self):
+        async with self._assistant_lock:
+            if self._assistant is None:
+                self._assistant = await self.client.beta.assistants.retrieve(self.assistant_id)
+        return self._assistant
+
+    async def thread_id_for(self, wa_id, name):
+        thread_id = await asyncio.to_thread(self.store.get, wa_id)
+        if thread_id is None:
+            logging.info(f"Creating new thread for {name} with wa_id {wa_id}")
+            thread = await self.client.beta.threads.create()
+            thread_id = await asyncio.to_thread(self.store.put, wa_id, thread.id)
+        return thread_id
+
+    async def _wait_for_run(self, thread_id, run):
+        delays = poll_delays(**self.poll)
+        while run.status not in TERMINAL_RUN_STATUSES:
+            await asyncio.sleep(next(delays))
+            run = await self.client.beta.threads.runs.retrieve(run.id, thread_id=thread_id)
+        return run
+
+    async def run(self, thread_id):
+        """Runs the assistant on `thread_id` and returns the newest message text."""
+        assistant = await self.assistant()
+        run = await self.client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant.id)
+        try:
+            run = await asyncio.wait_for(self._wait_for_run(thread_id, run), self.run_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # Stop the run server-side too, so it does not keep the thread locked
+            try:
+                await asyncio.shield(self.client.beta.threads.runs.cancel(run.id, thread_id=thread_id))
+            except Exception as e:
+                logging.warning(f"Could not cancel run {run.id}: {e}")
+            raise
+        if run.status != "completed":
+            raise AssistantRunError(f"Run {run.id} ended with status {run.status}")
+
+        messages = await self.client.beta.threads.messages.list(thread_id=thread_id, order="desc", limit=1)
+        new_message = messages.data[0].content[0].text.value
+        logging.info(f"Generated message: {new_message}")
+        return new_message
+
+    async def generate_response(self, message_body, wa_id, name):
+        thread_id = await self.thread_id_for(wa_id, name)
+        await self.client.beta.threads.messages.create(thread_id=thread_id, role="user", content=message_body)
+        return await self.run(thread_id)
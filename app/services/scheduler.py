@@ -0,0 +1,127 @@
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+
+
+def seconds_until_next_close(interval_seconds, delay_seconds, now=None):
+    """Seconds until `delay_seconds` after the next candle boundary (boundaries are multiples of the interval)."""
+    now = time.time() if now is None else now
+    next_close = (now // interval_seconds + 1) * interval_seconds
+    wait = next_close + delay_seconds - now
+    # Still inside the grace period of the candle that just closed
+    if wait > interval_seconds:
+        wait -= interval_seconds
+    return wait
+
+
+class PipelineScheduler:
+    """
+    Runs `job` shortly after every candle close and on demand.
+
+    Only one run is ever in flight. Triggers that arrive while a run is in
+    progress are coalesced into a single follow-up run, and every trigger gets
+    a job id whose status can be polled.
+    """
+
+    def __init__(self, job, interval_minutes=15, delay_seconds=30, max_jobs=200):
+        self.job = job
+        self.interval_seconds = interval_minutes * 60
+        self.delay_seconds = delay_seconds
+        self.max_jobs = max_jobs
+
+        self._jobs = OrderedDict()
+        self._pending = None
+        self._running = None
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for target, name in ((self._worker, "pipeline-worker"), (self._clock, "pipeline-clock")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+
+    def trigger(self, reason="manual"):
+        """Queues a run and returns its job id; joins the already queued run if there is one."""
+        with self._condition:
+            if self._pending is not None:
+                return self._pending
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "reason": reason,
+                "queued_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "error": None,
+            }
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+            self._pending = job_id
+            self._condition.notify_all()
+            return job_id
+
+    def status(self, job_id):
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id, timeout=None):
+        """Blocks until the job has finished and returns its status."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while self._jobs.get(job_id, {}).get("status") in ("queued", "running"):
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _clock(self):
+        while not self._stopped.is_set():
+            wait = seconds_until_next_close(self.interval_seconds, self.delay_seconds)
+            if self._stopped.wait(wait):
+                return
+            logging.info("Candle closed. Scheduling a pipeline run...")
+            self.trigger("schedule")
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped.is_set():
+                    self._condition.wait()
+                if self._stopped.is_set():
+                    return
+                job_id, self._pending = self._pending, None
+                self._running = job_id
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    job["status"] = "running"
+                    job["started_at"] = time.time()
+
+            status, error = "done", None
+            try:
+                self.job()
+            except Exception as e:
+                logging.error(f"Pipeline run {job_id} failed: {e}")
+                status, error = "failed", str(e)
+
+            with self._condition:
+                self._running = None
+                if job is not None:
+                    job["status"] = status
+                    job["error"] = error
+                    job["finished_at"] = time.time()
+                self._condition.notify_all()
@@ -0,0 +1,57 @@
+import time
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+# An immutable published result: `data` is a read-only view that is never mutated after publish
+Snapshot = namedtuple("Snapshot", ["version", "data", "published_at"])
+
+
+def freeze(value):
+    """Deep read-only copy: dicts become mappingproxies and lists become tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Plain, mutable copy of a frozen value, e.g. for jsonify."""
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class SnapshotBus:
+    """
+    In-process publish/subscribe holder for the latest pipeline result.
+
+    The pipeline publishes; Flask routes and the WhatsApp bot read the latest
+    snapshot directly or block until a newer version is published.
+    """
+
+    def __init__(self, initial=None):
+        self._condition = threading.Condition()
+        self._snapshot = Snapshot(0, freeze(initial or {}), time.time())
+
+    def publish(self, data):
+        with self._condition:
+            self._snapshot = Snapshot(self._snapshot.version + 1, freeze(data), time.time())
+            self._condition.notify_all()
+            return self._snapshot
+
+    def latest(self):
+        return self._snapshot
+
+    def wait_for_newer(self, version, timeout=None):
+        """Returns the first snapshot newer than `version`, or None if none arrives within `timeout` seconds."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._snapshot.version > version, timeout):
+                return None
+            return self._snapshot
+
+
+snapshot_bus = SnapshotBus({"trend": "Processing not started yet."})
@@ -0,0 +1,95 @@
+import os
+import dbm
+import shelve
+import argparse
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+DEFAULT_PATH = "threads.db"
+
+
+class ThreadStore:
+    """
+    Maps WhatsApp ids to OpenAI thread ids.
+
+    Backed by SQLite in WAL mode, so several workers can read and write at
+    once without locking a whole file, with an LRU cache of `cache_size`
+    entries in front. Each thread of the process keeps its own connection
+    open for the process lifetime.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, cache_size=10_000):
+        self.path = path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        db = self._connection()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("CREATE TABLE IF NOT EXISTS threads (wa_id TEXT PRIMARY KEY, thread_id TEXT NOT NULL)")
+
+    def _connection(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.db = db
+        return db
+
+    def _remember(self, wa_id, thread_id):
+        with self._lock:
+            self._cache[wa_id] = thread_id
+            self._cache.move_to_end(wa_id)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def get(self, wa_id):
+        with self._lock:
+            if wa_id in self._cache:
+                self._cache.move_to_end(wa_id)
+                return self._cache[wa_id]
+        row = self._connection().execute("SELECT thread_id FROM threads WHERE wa_id = ?", (wa_id,)).fetchone()
+        if row is None:
+            return None
+        self._remember(wa_id, row[0])
+        return row[0]
+
+    def put(self, wa_id, thread_id):
+        """
+        Stores `thread_id` unless another worker already stored one for `wa_id`.
+        Returns the thread id that is kept, so concurrent first messages share a thread.
+        """
+        db = self._connection()
+        db.execute("INSERT OR IGNORE INTO threads (wa_id, thread_id) VALUES (?, ?)", (wa_id, thread_id))
+        stored = db.execute("SELECT thread_id FROM threads WHERE wa_id = ?", (wa_id,)).fetchone()[0]
+        self._remember(wa_id, stored)
+        return stored
+
+    def import_shelve(self, path):
+        """One-off copy of a legacy shelve file (the old `threads_db`); missing files are ignored."""
+        try:
+            with shelve.open(path, flag="r") as threads_shelf:
+                rows = list(threads_shelf.items())
+        except dbm.error:
+            return 0
+        self._connection().executemany("INSERT OR IGNORE INTO threads (wa_id, thread_id) VALUES (?, ?)", rows)
+        logging.info(f"Imported {len(rows)} threads from {path}.")
+        return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="One-off migration: copy WhatsApp thread ids from the legacy threads_db shelve into the SQLite store.")
+    parser.add_argument("shelve", nargs="?", default="threads_db", help="Legacy shelve file (default threads_db)")
+    parser.add_argument("--db", default=os.getenv("THREAD_STORE_DB", DEFAULT_PATH),
+                        help="SQLite store (default THREAD_STORE_DB or threads.db)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if not ThreadStore(args.db).import_shelve(args.shelve):
+        logging.info(f"No threads imported from {args.shelve}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import os
+import math
+import time
+import atexit
+import sqlite3
+import threading
+
+DEFAULT_PATH = "trade_ledger.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    wa_id TEXT NOT NULL,
+    buy_price REAL NOT NULL,
+    opened_at REAL NOT NULL,
+    sell_price REAL,
+    closed_at REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS trades_open_wa_id ON trades (wa_id) WHERE closed_at IS NULL;
+CREATE INDEX IF NOT EXISTS trades_wa_id ON trades (wa_id);
+"""
+
+
+class TradeLedger:
+    """
+    Open and closed trades per WhatsApp user, stored in SQLite (WAL mode) so
+    every web worker and the broadcast loop share one view that survives restarts.
+
+    Reads go through an in-process cache of open trades. The cache is dropped
+    whenever another connection commits (`PRAGMA data_version` changes), so a
+    process never serves another process's stale state. Writes are committed
+    before they return, each in one short transaction, so the next read in any
+    process sees them; an sqlite3.Error from a write means it was not recorded.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+        self._lock = threading.RLock()
+        self._cache = {}  # wa_id -> open trade dict, or None when known to have none
+        self._complete = False  # True once every open trade is in the cache
+        self._data_version = self._read_data_version()
+        self._closed = False
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+    def _read_data_version(self):
+        return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def _revalidate(self):
+        version = self._read_data_version()
+        if version != self._data_version:
+            # Another process committed: forget everything
+            self._data_version = version
+            self._cache = {}
+            self._complete = False
+
+    def get(self, wa_id):
+        """The open trade for `wa_id` ({"bought": True, "buy_price": ...}), or None."""
+        with self._lock:
+            self._revalidate()
+            if wa_id in self._cache:
+                return self._cache[wa_id]
+            if self._complete:
+                return None
+            row = self._db.execute(
+                "SELECT buy_price FROM trades WHERE wa_id = ? AND closed_at IS NULL", (wa_id,)
+            ).fetchone()
+            trade = {"bought": True, "buy_price": row[0]} if row else None
+            self._cache[wa_id] = trade
+            return trade
+
+    def __contains__(self, wa_id):
+        return self.get(wa_id) is not None
+
+    def open_trades(self):
+        """{wa_id: trade} for every open trade, with one query when the cache is cold."""
+        with self._lock:
+            self._revalidate()
+            if not self._complete:
+                rows = self._db.execute("SELECT wa_id, buy_price FROM trades WHERE closed_at IS NULL").fetchall()
+                self._cache = {wa_id: {"bought": True, "buy_price": price} for wa_id, price in rows}
+                self._complete = True
+            return {wa_id: trade for wa_id, trade in self._cache.items() if trade is not None}
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def _transaction(self, write):
+        """
+        Runs `write(db)` in a BEGIN IMMEDIATE transaction and commits it; rolls back and
+        re-raises on any error. Returns what `write` returns.
+        """
+        with self._lock:
+            self._revalidate()
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = write(self._db)
+                self._db.execute("COMMIT")
+            except BaseException:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                raise
+            return result
+
+    def open_trade(self, wa_id, buy_price):
+        """Records a purchase; an earlier open trade for the same user is closed without a sell price."""
+        if not math.isfinite(buy_price):
+            raise ValueError(f"buy_price must be a finite number, got {buy_price}")
+        now = time.time()
+        trade = {"bought": True, "buy_price": buy_price}
+
+        def write(db):
+            db.execute("UPDATE trades SET closed_at = ? WHERE closed_at IS NULL AND wa_id = ?", (now, wa_id))
+            db.execute("INSERT INTO trades (wa_id, buy_price, opened_at) VALUES (?, ?, ?)", (wa_id, buy_price, now))
+
+        with self._lock:
+            self._transaction(write)
+            self._cache[wa_id] = trade
+        return trade
+
+    def close_trade(self, wa_id, sell_price=None):
+        """Closes the open trade for `wa_id` and returns it, or None if there was none."""
+        if sell_price is not None and not math.isfinite(sell_price):
+            raise ValueError(f"sell_price must be a finite number, got {sell_price}")
+
+        def write(db):
+            # Read inside the transaction: another worker may have just opened or closed it
+            row = db.execute(
+                "SELECT buy_price FROM trades WHERE wa_id = ? AND closed_at IS NULL", (wa_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE trades SET sell_price = ?, closed_at = ? WHERE closed_at IS NULL AND wa_id = ?",
+                       (sell_price, time.time(), wa_id))
+            return {"bought": True, "buy_price": row[0]}
+
+        with self._lock:
+            trade = self._transaction(write)
+            self._cache[wa_id] = None
+        return trade
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._db.close()
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_trade_ledger():
+    """Process-wide ledger at TRADE_LEDGER_DB (default trade_ledger.db), opened on first use."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = TradeLedger(os.getenv("TRADE_LEDGER_DB", DEFAULT_PATH))
+        return _ledger
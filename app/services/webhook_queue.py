@@ -0,0 +1,106 @@
+import zlib
+import queue
+import logging
+import threading
+from contextlib import nullcontext
+
+_STOP = object()
+
+
+class PartitionedWorkQueue:
+    """
+    Bounded work queue drained by one worker thread per partition.
+
+    Items are routed by key (the sender's wa_id), so one user's messages are
+    handled in arrival order while different users are handled in parallel.
+    `submit` never blocks: when a partition is full it returns False and the
+    caller can push back (e.g. answer 503 so Meta retries later).
+    `context` is a callable returning a context manager entered once per worker,
+    e.g. `app.app_context` so handlers can use `current_app`.
+    """
+
+    def __init__(self, handler, partitions=8, maxsize=1000, context=None):
+        self.handler = handler
+        self.context = context or nullcontext
+        self.partitions = max(1, partitions)
+        # maxsize bounds the whole queue; each partition gets an equal share
+        self.partition_size = max(1, maxsize // self.partitions)
+        self._queues = [queue.Queue(self.partition_size) for _ in range(self.partitions)]
+        self._threads = []
+        self._lock = threading.Lock()
+        self._counters = {"enqueued": 0, "processed": 0, "failed": 0, "rejected": 0}
+        self._high_water = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.partitions):
+                thread = threading.Thread(target=self._worker, args=(index,),
+                                          name=f"webhook-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Lets the workers drain what is already queued, then stops them."""
+        for partition in self._queues:
+            partition.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _partition(self, key):
+        # crc32 rather than hash(): stable across processes and restarts
+        return zlib.crc32(str(key).encode("utf-8")) % self.partitions
+
+    def submit(self, key, item):
+        """Queues `item` on `key`'s partition. Returns False if that partition is full."""
+        self.start()
+        partition = self._queues[self._partition(key)]
+        try:
+            partition.put_nowait(item)
+        except queue.Full:
+            self._count("rejected")
+            logging.warning(f"Webhook queue partition full; rejecting message for {key}.")
+            return False
+        self._count("enqueued")
+        depth = partition.qsize()
+        if depth > self._high_water:
+            self._high_water = depth
+        return True
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _worker(self, index):
+        partition = self._queues[index]
+        with self.context():
+            while True:
+                item = partition.get()
+                if item is _STOP:
+                    return
+                try:
+                    self.handler(item)
+                    self._count("processed")
+                except Exception:
+                    self._count("failed")
+                    logging.exception("Webhook message handler failed.")
+
+    def depth(self):
+        return sum(partition.qsize() for partition in self._queues)
+
+    def stats(self):
+        """Backpressure metrics: current depth per partition, capacity and counters."""
+        depths = [partition.qsize() for partition in self._queues]
+        with self._lock:
+            counters = dict(self._counters)
+        return dict(
+            counters,
+            depth=sum(depths),
+            partition_depths=depths,
+            capacity=self.partition_size * self.partitions,
+            partition_capacity=self.partition_size,
+            high_water=self._high_water,
+            workers=len(self._threads),
+        )
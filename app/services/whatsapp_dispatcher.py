@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+
+import aiohttp
+
+from app.services.metrics import whatsapp_send_seconds, whatsapp_send_total
+
+GRAPH_API_URL = "https://graph.facebook.com"
+DEFAULT_RATE = 80  # Cloud API default throughput per phone number (messages/second)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class WhatsAppDispatcher:
+    """
+    Sends Graph API messages over one pooled aiohttp session.
+
+    Concurrency is bounded by a semaphore, throughput by a token bucket, and
+    429/5xx responses or connection errors are retried with jittered
+    exponential backoff (honouring Retry-After when the API sends it).
+    `base_url` can point at a local stub server.
+    """
+
+    def __init__(self, access_token, phone_number_id, version, base_url=GRAPH_API_URL,
+                 rate=DEFAULT_RATE, concurrency=32, max_retries=5, backoff=0.5, max_backoff=30.0, timeout=10):
+        self.url = f"{base_url.rstrip('/')}/{version}/{phone_number_id}/messages"
+        self.headers = {
+            "Content-type": "application/json",
+            "Authorization": f"Bearer {access_token}",
+        }
+        self.limiter = TokenBucket(rate)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = None
+        self._semaphore = None
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        kwargs.setdefault("rate", float(os.getenv("WHATSAPP_RATE_LIMIT", DEFAULT_RATE)))
+        kwargs.setdefault("base_url", os.getenv("GRAPH_API_URL", GRAPH_API_URL))
+        return cls(os.getenv("ACCESS_TOKEN"), os.getenv("PHONE_NUMBER_ID"), os.getenv("VERSION"), **kwargs)
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+        self._session = aiohttp.ClientSession(connector=connector, headers=self.headers, timeout=self.timeout)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+        self._session = None
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return min(self.max_backoff, float(retry_after))
+            except ValueError:
+                pass
+        # Full jitter: spreads retries of a burst instead of synchronising them
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def send(self, data):
+        """Sends one message payload (JSON string or dict). Returns (status, body); status 0 on network failure."""
+        if not isinstance(data, str):
+            data = json.dumps(data)
+
+        start = time.perf_counter()
+        status, body = 0, ""
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    async with self._session.post(self.url, data=data) as response:
+                        status, body = response.status, await response.text()
+                        retry_after = response.headers.get("Retry-After")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, body = 0, str(e)
+
+            if status == 200 or (status and status not in RETRY_STATUSES):
+                break
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._delay(attempt, retry_after))
+
+        whatsapp_send_seconds.observe(time.perf_counter() - start, path="broadcast")
+        whatsapp_send_total.inc(path="broadcast", status=status)
+        if status != 200:
+            logging.error(f"Failed to send WhatsApp message: {status}, {body}")
+        return status, body
+
+    async def send_sequence(self, payloads):
+        """Sends one recipient's messages in order."""
+        return [await self.send(payload) for payload in payloads]
+
+    async def broadcast(self, messages):
+        """
+        `messages` maps each recipient to its list of payloads. Recipients are sent
+        to concurrently; each recipient's messages keep their order.
+        """
+        recipients = list(messages)
+        results = await asyncio.gather(*(self.send_sequence(messages[r]) for r in recipients))
+        return dict(zip(recipients, results))
+
+
+def broadcast(messages, **kwargs):
+    """Blocking helper: sends `messages` ({recipient: [payload, ...]}) with a dispatcher configured from the environment."""
+    async def run():
+        async with WhatsAppDispatcher.from_env(**kwargs) as dispatcher:
+            return await dispatcher.broadcast(messages)
+
+    return asyncio.run(run())
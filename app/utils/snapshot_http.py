@@ -0,0 +1,119 @@
+import gzip
+import json
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+from app.services.snapshot_bus import thaw
+
+GZIP_MIN_SIZE = 1024  # Smaller bodies are not worth compressing
+CACHE_SIZE = 64
+BOOT_ID = uuid.uuid4().hex[:8]  # Event ids are "<boot>:<version>"; versions restart with the process
+
+
+class _EncodedCache:
+    """Small LRU of encoded bodies, so a snapshot is serialized and compressed once, not per client."""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        value = build()
+        with self._lock:
+            self._items[key] = value
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+
+_bodies = _EncodedCache()
+_gzipped = _EncodedCache()
+
+
+def encode_snapshot(snapshot, path=()):
+    """
+    JSON body and ETag for a snapshot, or for the part of it found under `path`.
+    The ETag is derived from the bytes, so identical content keeps the same tag.
+    """
+    def build():
+        data = snapshot.data
+        for key in path:
+            data = data[key]
+        # allow_nan=False: a stray NaN fails here instead of reaching clients as invalid JSON
+        body = json.dumps(thaw(data), separators=(",", ":"), sort_keys=True, allow_nan=False).encode("utf-8")
+        return body, '"' + hashlib.sha1(body).hexdigest() + '"'
+
+    return _bodies.get((snapshot.version, tuple(path)), build)
+
+
+def _etag_matches(etag):
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in header.split(",")]
+    return etag in tags or f"W/{etag}" in tags
+
+
+def conditional_json(body, etag):
+    """JSON response honouring If-None-Match (304) and Accept-Encoding: gzip."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if _etag_matches(etag):
+        return Response(status=304, headers=headers)
+
+    if len(body) >= GZIP_MIN_SIZE and "gzip" in request.headers.get("Accept-Encoding", ""):
+        body = _gzipped.get(etag, lambda: gzip.compress(body, compresslevel=6))
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(body, mimetype="application/json", headers=headers)
+
+
+def resume_version(last_event_id):
+    """
+    The snapshot version a client's Last-Event-ID header resumes after: 0 (send the
+    current snapshot) unless the id was issued by this process.
+    """
+    boot, _, version = (last_event_id or "").partition(":")
+    if boot != BOOT_ID:
+        return 0
+    try:
+        return int(version)
+    except ValueError:
+        return 0
+
+
+def _event(snapshot):
+    body, _ = encode_snapshot(snapshot)
+    return f"id: {BOOT_ID}:{snapshot.version}\nevent: snapshot\ndata: {body.decode('utf-8')}\n\n"
+
+
+def sse_stream(bus, last_version=0, keepalive=15):
+    """
+    Server-Sent Events generator: one `snapshot` event per published version,
+    with a comment line every `keepalive` seconds to hold the connection open.
+    A `last_version` ahead of the bus (from before a restart) starts over at 0.
+    """
+    snapshot = bus.latest()
+    if last_version > snapshot.version:
+        last_version = 0
+    if snapshot.version > last_version:
+        last_version = snapshot.version
+        yield _event(snapshot)
+
+    while True:
+        snapshot = bus.wait_for_newer(last_version, timeout=keepalive)
+        if snapshot is None:
+            yield ": keep-alive\n\n"
+            continue
+        last_version = snapshot.version
+        yield _event(snapshot)
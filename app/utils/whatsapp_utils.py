@@ -1,8 +1,14 @@
 import logging
 from flask import current_app, jsonify
 import json
+import math
+import time
+import sqlite3
 import requests
 
+from app.services.trade_ledger import get_trade_ledger
+from app.services.metrics import whatsapp_send_seconds, whatsapp_send_total
+
 # from app.services.openai_service import generate_response
 import re
 
@@ -30,6 +36,10 @@ def generate_response(response):
     return response.upper()
 
 
+# Shared session so replies reuse the keep-alive connection to the Graph API
+http_session = requests.Session()
+
+
 def send_message(data):
     headers = {
         "Content-type": "application/json",
@@ -38,10 +48,13 @@ def send_message(data):
 
     url = f"https://graph.facebook.com/{current_app.config['VERSION']}/{current_app.config['PHONE_NUMBER_ID']}/messages"
 
+    start = time.perf_counter()
+    status = 0
     try:
-        response = requests.post(
+        response = http_session.post(
             url, data=data, headers=headers, timeout=10
         )  # 10 seconds timeout as an example
+        status = response.status_code
         response.raise_for_status()  # Raises an HTTPError if the HTTP request returned an unsuccessful status code
     except requests.Timeout:
         logging.error("Timeout occurred while sending message")
@@ -55,6 +68,9 @@ def send_message(data):
         # Process the response as normal
         log_http_response(response)
         return response
+    finally:
+        whatsapp_send_seconds.observe(time.perf_counter() - start, path="reply")
+        whatsapp_send_total.inc(path="reply", status=status)
 
 
 def process_text_for_whatsapp(text):
@@ -75,29 +91,123 @@ def process_text_for_whatsapp(text):
     return whatsapp_style_text
 
 
-user_purchases = {}  # Example: {"919876543210": {"bought": True, "buy_price": 25.50}}
+class WhatsAppMessage:
+    """One inbound message, extracted once at ingress."""
+
+    __slots__ = ("id", "wa_id", "name", "type", "text", "timestamp")
+
+    def __init__(self, id, wa_id, name, type, text, timestamp):
+        self.id = id
+        self.wa_id = wa_id
+        self.name = name
+        self.type = type
+        self.text = text
+        self.timestamp = timestamp
+
+
+class WhatsAppStatus:
+    """One sent/delivered/read notification for an outbound message."""
+
+    __slots__ = ("id", "recipient_id", "status", "timestamp")
+
+    def __init__(self, id, recipient_id, status, timestamp):
+        self.id = id
+        self.recipient_id = recipient_id
+        self.status = status
+        self.timestamp = timestamp
+
+
+class WebhookEvents:
+    __slots__ = ("object", "messages", "statuses")
+
+    def __init__(self, object, messages, statuses):
+        self.object = object
+        self.messages = messages
+        self.statuses = statuses
+
+
+def extract_events(body):
+    """
+    Flattens every message and status in every entry and change of a webhook
+    delivery (Meta may batch several into one request) into typed objects.
+    """
+    messages = []
+    statuses = []
+    for entry in body.get("entry") or ():
+        for change in entry.get("changes") or ():
+            value = change.get("value") or {}
+            for status in value.get("statuses") or ():
+                statuses.append(WhatsAppStatus(
+                    status.get("id"), status.get("recipient_id"), status.get("status"), status.get("timestamp"),
+                ))
+            raw_messages = value.get("messages")
+            if not raw_messages:
+                continue
+            names = {
+                contact.get("wa_id"): (contact.get("profile") or {}).get("name")
+                for contact in value.get("contacts") or ()
+            }
+            for message in raw_messages:
+                wa_id = message.get("from") or next(iter(names), None)
+                message_type = message.get("type", "text")
+                text = (message.get("text") or {}).get("body") if message_type == "text" else None
+                messages.append(WhatsAppMessage(
+                    message.get("id"), wa_id, names.get(wa_id), message_type, text, message.get("timestamp"),
+                ))
+    return WebhookEvents(body.get("object"), messages, statuses)
+
+
+def parse_webhook(raw):
+    """Parses the raw request bytes once. Returns WebhookEvents, or None if the body is not a JSON object."""
+    try:
+        body = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(body, dict):
+        return None
+    return extract_events(body)
+
 
 def process_whatsapp_message(body):
-    wa_id = body["entry"][0]["changes"][0]["value"]["contacts"][0]["wa_id"]
-    name = body["entry"][0]["changes"][0]["value"]["contacts"][0]["profile"]["name"]
+    for message in extract_events(body).messages:
+        process_message(message)
 
-    message = body["entry"][0]["changes"][0]["value"]["messages"][0]
-    message_body = message["text"]["body"].strip().lower()
 
-    has_bought = wa_id in user_purchases  # Check if user has an active trade
+def parse_price(text):
+    """The price at the end of a trade message; ValueError unless it is a finite number."""
+    price = float(text.split()[-1])
+    if not math.isfinite(price):
+        raise ValueError(f"Price must be a finite number, got {price}")
+    return price
+
+
+def process_message(message):
+    wa_id = message.wa_id
+    if message.type != "text" or message.text is None:
+        logging.info(f"Ignoring {message.type} message from {wa_id}.")
+        return
+
+    message_body = message.text.strip().lower()
+
+    ledger = get_trade_ledger()
+    trade = ledger.get(wa_id)  # Open trade shared with other workers and the broadcast loop
+    has_bought = trade is not None
 
     if "🚩" in message_body:  # User confirms they have bought
         try:
-            buy_price = float(message_body.split()[-1])  # Extract price
-            user_purchases[wa_id] = {"bought": True, "buy_price": buy_price}
+            buy_price = parse_price(message_body)  # Extract price
+            ledger.open_trade(wa_id, buy_price)
 
             response = f"✅ Trade recorded at {buy_price}. Waiting for sell signal."
         except ValueError:
             response = "❌ Invalid format. Use: 🚩 Bought at <price>"
+        except sqlite3.Error as e:
+            logging.error(f"Failed to record trade for {wa_id}: {e}")
+            response = "⚠️ Could not record your trade. Please send it again."
 
     elif message_body == "sell":
         if has_bought:
-            buy_price = user_purchases[wa_id]["buy_price"]
+            buy_price = trade["buy_price"]
             response = f"✅ Sell signal received. Please confirm sale by sending 'sold at <price>'."
         else:
             response = "🚫 You haven't bought silver yet. No sell signal available."
@@ -105,20 +215,26 @@ def process_whatsapp_message(body):
     elif "sold at" in message_body:
         if has_bought:
             try:
-                sell_price = float(message_body.split()[-1])  # Extract price
-                buy_price = user_purchases[wa_id]["buy_price"]
+                sell_price = parse_price(message_body)  # Extract price
+
+                # Close the trade in the ledger; another worker may have closed it meanwhile
+                trade = ledger.close_trade(wa_id, sell_price)
+                if trade is None:
+                    response = "🚫 You haven't bought silver yet. No record found."
+                else:
+                    buy_price = trade["buy_price"]
 
-                # Calculate profit or loss
-                profit_loss = round(sell_price - buy_price, 2)
-                status = "Profit" if profit_loss > 0 else "Loss" if profit_loss < 0 else "Break-even"
+                    # Calculate profit or loss
+                    profit_loss = round(sell_price - buy_price, 2)
+                    status = "Profit" if profit_loss > 0 else "Loss" if profit_loss < 0 else "Break-even"
 
-                response = f"💰 Trade closed. Bought at {buy_price}, sold at {sell_price}. {status}: {profit_loss}"
-                
-                # Remove user record from memory
-                del user_purchases[wa_id]
+                    response = f"💰 Trade closed. Bought at {buy_price}, sold at {sell_price}. {status}: {profit_loss}"
 
             except ValueError:
                 response = "❌ Invalid format. Use: sold at <price>"
+            except sqlite3.Error as e:
+                logging.error(f"Failed to close trade for {wa_id}: {e}")
+                response = "⚠️ Could not record your sale. Please send it again."
         else:
             response = "🚫 You haven't bought silver yet. No record found."
 
@@ -148,15 +264,8 @@ def process_whatsapp_message(body):
 #     send_message(data)
 
 
-def is_valid_whatsapp_message(body):
+def is_valid_whatsapp_message(events):
     """
-    Check if the incoming webhook event has a valid WhatsApp message structure.
+    Check if the extracted webhook events contain at least one WhatsApp message.
     """
-    return (
-        body.get("object")
-        and body.get("entry")
-        and body["entry"][0].get("changes")
-        and body["entry"][0]["changes"][0].get("value")
-        and body["entry"][0]["changes"][0]["value"].get("messages")
-        and body["entry"][0]["changes"][0]["value"]["messages"][0]
-    )
+    return bool(events.object) and bool(events.messages)
@@ -1,58 +1,112 @@
+import time
 import logging
-import json
+from functools import wraps
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, g, request, jsonify, current_app
 
 from .decorators.security import signature_required
+from .services.metrics import CONTENT_TYPE, registry, webhook_request_seconds, webhook_messages_total
 from .utils.whatsapp_utils import (
-    process_whatsapp_message,
+    parse_webhook,
     is_valid_whatsapp_message,
 )
 
 webhook_blueprint = Blueprint("webhook", __name__)
 
+# Most webhook hits are status updates; their reply is prebuilt instead of jsonified each time
+OK_BODY = b'{"status":"ok"}'
+
+
+def ok_response():
+    return Response(OK_BODY, status=200, mimetype="application/json")
+
+
+def timed_webhook(f):
+    """Records webhook handling latency, signature check included, labelled by g.webhook_kind."""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        start = time.perf_counter()
+        g.webhook_kind = "invalid"
+        try:
+            return f(*args, **kwargs)
+        finally:
+            webhook_request_seconds.observe(time.perf_counter() - start, kind=g.webhook_kind)
+
+    return decorated_function
+
 
 def handle_message():
     """
     Handle incoming webhook events from the WhatsApp API.
 
-    This function processes incoming WhatsApp messages and other events,
-    such as delivery statuses. If the event is a valid message, it gets
-    processed. If the incoming payload is not a recognized WhatsApp event,
-    an error is returned.
+    Every message in every entry and change is queued for the per-user workers
+    and the request is acknowledged right away, so Meta does not time out
+    and retry while replies are being sent. When the queue is full the
+    webhook answers 503 and Meta redelivers later. Messages whose id was
+    already seen (redeliveries) are acknowledged without being queued again,
+    as are status-only events.
 
     Every message send will trigger 4 HTTP requests to your webhook: message, sent, delivered, read.
 
     Returns:
         response: A tuple containing a JSON response and an HTTP status code.
     """
-    body = request.get_json()
-    # logging.info(f"request body: {body}")
-
-    # Check if it's a WhatsApp status update
-    if (
-        body.get("entry", [{}])[0]
-        .get("changes", [{}])[0]
-        .get("value", {})
-        .get("statuses")
-    ):
-        logging.info("Received a WhatsApp status update.")
-        return jsonify({"status": "ok"}), 200
-
-    try:
-        if is_valid_whatsapp_message(body):
-            process_whatsapp_message(body)
-            return jsonify({"status": "ok"}), 200
-        else:
-            # if the request is not a WhatsApp API event, return an error
-            return (
-                jsonify({"status": "error", "message": "Not a WhatsApp API event"}),
-                404,
-            )
-    except json.JSONDecodeError:
+    # The raw bytes were already read for the signature check; they are parsed exactly once here
+    events = parse_webhook(request.get_data())
+    if events is None:
         logging.error("Failed to decode JSON")
         return jsonify({"status": "error", "message": "Invalid JSON provided"}), 400
 
+    if not is_valid_whatsapp_message(events):
+        # Check if it's a WhatsApp status update
+        if events.statuses:
+            g.webhook_kind = "status"
+            logging.debug(f"Received {len(events.statuses)} WhatsApp status update(s).")
+            return ok_response()
+        # if the request is not a WhatsApp API event, return an error
+        return (
+            jsonify({"status": "error", "message": "Not a WhatsApp API event"}),
+            404,
+        )
+
+    g.webhook_kind = "message"
+    webhook_queue = current_app.extensions["webhook_queue"]
+    dedup = current_app.extensions["webhook_dedup"]
+    rejected = 0
+    for message in events.messages:
+        if not dedup.claim(message.id):
+            logging.info(f"Ignoring redelivered message {message.id}.")
+            webhook_messages_total.inc(outcome="duplicate")
+            continue
+        if not webhook_queue.submit(message.wa_id, message):
+            # Not queued, so the redelivery Meta makes after the 503 must be accepted
+            dedup.release(message.id)
+            webhook_messages_total.inc(outcome="rejected")
+            rejected += 1
+        else:
+            webhook_messages_total.inc(outcome="queued")
+
+    if rejected:
+        return (
+            jsonify({"status": "error", "message": f"Queue full, {rejected} message(s) not accepted"}),
+            503,
+            {"Retry-After": "5"},
+        )
+    return ok_response()
+
+
+@webhook_blueprint.route("/webhook/queue", methods=["GET"])
+def webhook_queue_stats():
+    # Backpressure metrics for the webhook workers
+    return jsonify(current_app.extensions["webhook_queue"].stats()), 200
+
+
+@webhook_blueprint.route("/metrics", methods=["GET"])
+def metrics():
+    # Prometheus text format: pipeline stages, sheet rows, outbound sends, webhook latency and queue depth
+    return Response(registry.render(), mimetype=None, content_type=CONTENT_TYPE)
+
 
 # Required webhook verifictaion for WhatsApp
 def verify():
@@ -82,6 +136,7 @@ def webhook_get():
     return verify()
 
 @webhook_blueprint.route("/webhook", methods=["POST"])
+@timed_webhook
 @signature_required
 def webhook_post():
     return handle_message()
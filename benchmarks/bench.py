@@ -0,0 +1,284 @@
+import os
+import sys
+import hmac
+import json
+import time
+import hashlib
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_ohlcv
+from benchmarks.fakes import FakeWorksheet
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+SHEET_MAX_ROWS = 200_000  # Google Sheets caps a spreadsheet at 10M cells (~1.6M rows of 6 columns)
+NEW_CANDLES = 96  # One trading day of 15m candles appended per sheet sync
+APP_SECRET = "benchmark-secret"
+
+log = logging.getLogger("benchmarks")
+
+
+def timed(fn, repeat=3, setup=None):
+    """Runs `fn` `repeat` times (after `setup`, which is not timed). Returns the timings in seconds."""
+    timings = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(name, size, timings, **extra):
+    best = min(timings)
+    result = {
+        "name": name,
+        "size": size,
+        "seconds_min": best,
+        "seconds_median": statistics.median(timings),
+        "rows_per_second": size / best if best else None,
+        "repeat": len(timings),
+    }
+    result.update(extra)
+    log.info(f"{name:<32} n={size:<9} min={best * 1000:10.2f} ms")
+    return result
+
+
+def percentiles(samples):
+    values = np.asarray(samples) * 1000
+    return {f"p{p}_ms": float(np.percentile(values, p)) for p in (50, 90, 99)}
+
+
+# ----------------------------------------------------------------------
+# Data pipeline
+# ----------------------------------------------------------------------
+def bench_pipeline(size, repeat):
+    from silver_data.indicators import calculate_indicators
+    from silver_data.indicator_engine import IndicatorEngine
+    from silver_data.Indicator_signal import generate_signals
+    from silver_data.trend import identify_trend_signals, TREND_WINDOW
+    from silver_data.candle_buffer import CandleRingBuffer
+    from silver_data.pipeline import BUFFER_CAPACITY
+
+    candles = generate_ohlcv(size)
+    results = [summarize(
+        "calculate_indicators", size,
+        timed(calculate_indicators, repeat, setup=lambda: (candles.copy(),)),
+    )]
+
+    # Incremental path: the engine has seen every candle but the newest one
+    def incremental_setup():
+        engine = IndicatorEngine()
+        calculate_indicators(candles.iloc[:-1].copy(), engine=engine)
+        return candles.copy(), engine
+    results.append(summarize(
+        "calculate_indicators_incremental", size,
+        timed(calculate_indicators, repeat, setup=incremental_setup),
+    ))
+
+    with_indicators = calculate_indicators(candles.copy())
+    results.append(summarize(
+        "generate_signals", size,
+        timed(generate_signals, repeat, setup=lambda: (with_indicators.copy(),)),
+    ))
+    results.append(summarize(
+        "identify_trend_signals", size,
+        timed(identify_trend_signals, repeat, setup=lambda: (candles,)),
+    ))
+
+    # What the pipeline runs: a view of the newest candles in the ring buffer
+    buffer = CandleRingBuffer(min(size, BUFFER_CAPACITY))
+    results.append(summarize(
+        "candle_buffer_extend", size,
+        timed(lambda: CandleRingBuffer(buffer.capacity).extend(candles), repeat),
+    ))
+    buffer.extend(candles)
+    results.append(summarize(
+        "identify_trend_signals_window", size,
+        timed(lambda: identify_trend_signals(buffer.window(TREND_WINDOW)), repeat),
+    ))
+    return results
+
+
+def bench_sheet(size, repeat):
+    from silver_data.silver_data import append_new_data
+    from silver_data.sheet_sync import SheetSyncState
+
+    candles = generate_ohlcv(size + NEW_CANDLES)
+    existing = candles.iloc[:size]
+    results = []
+
+    def full_read_setup():
+        return FakeWorksheet.from_frame(existing), candles.copy()
+    results.append(summarize(
+        "append_new_data", size,
+        timed(append_new_data, repeat, setup=full_read_setup),
+    ))
+
+    with tempfile.TemporaryDirectory() as directory:
+        def synced_setup():
+            worksheet = FakeWorksheet.from_frame(existing)
+            state = SheetSyncState(os.path.join(directory, "state.json"))
+            state.clear()
+            append_new_data(worksheet, existing.copy(), sync_state=state)  # Warm state, as after the first run
+            return worksheet, candles.copy(), state, size
+        results.append(summarize(
+            "append_new_data_synced", size,
+            timed(append_new_data, repeat, setup=synced_setup),
+        ))
+    return results
+
+
+# ----------------------------------------------------------------------
+# Webhook path
+# ----------------------------------------------------------------------
+def _message_body(index):
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"id": "0", "changes": [{"field": "messages", "value": {
+            "messaging_product": "whatsapp",
+            "contacts": [{"wa_id": f"9199{index % 500:06d}", "profile": {"name": "Bench"}}],
+            "messages": [{
+                "id": f"wamid.bench.{index}", "from": f"9199{index % 500:06d}", "timestamp": "1700000000",
+                "type": "text", "text": {"body": "sell"},
+            }],
+        }}]}],
+    }
+
+
+def _status_body(index):
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"id": "0", "changes": [{"field": "messages", "value": {
+            "messaging_product": "whatsapp",
+            "statuses": [{
+                "id": f"wamid.sent.{index}", "status": "delivered", "timestamp": "1700000000",
+                "recipient_id": f"9199{index % 500:06d}",
+            }],
+        }}]}],
+    }
+
+
+def bench_webhook(requests_count):
+    """
+    Signed webhook POSTs through the Flask test client, in Meta's usual mix of
+    one message to three status updates. Queued messages are dropped by a no-op
+    handler, so this measures ingress only and sends nothing.
+    """
+    from app import create_app
+
+    app = create_app()
+    app.config["APP_SECRET"] = APP_SECRET
+    webhook_queue = app.extensions["webhook_queue"]
+    webhook_queue.handler = lambda message: None
+    client = app.test_client()
+
+    payloads = []
+    for index in range(requests_count):
+        body = _message_body(index) if index % 4 == 0 else _status_body(index)
+        raw = json.dumps(body).encode("utf-8")
+        signature = hmac.new(APP_SECRET.encode("latin-1"), raw, hashlib.sha256).hexdigest()
+        payloads.append((index % 4 == 0, raw, {"X-Hub-Signature-256": f"sha256={signature}",
+                                              "Content-Type": "application/json"}))
+
+    latencies = {True: [], False: []}
+    start = time.perf_counter()
+    for is_message, raw, headers in payloads:
+        request_start = time.perf_counter()
+        response = client.post("/webhook", data=raw, headers=headers)
+        latencies[is_message].append(time.perf_counter() - request_start)
+        if response.status_code != 200:
+            raise RuntimeError(f"Webhook answered {response.status_code}: {response.data!r}")
+    elapsed = time.perf_counter() - start
+    webhook_queue.stop(timeout=5)
+
+    results = []
+    for name, samples in (("webhook", latencies[True] + latencies[False]),
+                          ("webhook_message", latencies[True]), ("webhook_status", latencies[False])):
+        result = dict(name=name, size=len(samples), **percentiles(samples))
+        if name == "webhook":
+            result["requests_per_second"] = len(samples) / elapsed
+            log.info(f"{name:<32} n={len(samples):<9} {result['requests_per_second']:10.0f} req/s "
+                         f"p50={result['p50_ms']:.3f} ms p99={result['p99_ms']:.3f} ms")
+        results.append(result)
+    return results
+
+
+# ----------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": pd.Timestamp.now(tz="UTC").isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def compare(results, baseline_path):
+    """Prints the ratio of each timing to the same benchmark in a previous results file."""
+    with open(baseline_path) as f:
+        baseline = {(r["name"], r["size"]): r for r in json.load(f)["results"]}
+    print(f"{'benchmark':<34}{'size':>10}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for result in results:
+        previous = baseline.get((result["name"], result["size"]))
+        key = "seconds_min" if "seconds_min" in result else "p50_ms"
+        if previous is None or key not in previous:
+            continue
+        ratio = result[key] / previous[key] if previous[key] else float("nan")
+        print(f"{result['name']:<34}{result['size']:>10}{previous[key]:>12.4g}{result[key]:>12.4g}{ratio:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data pipeline and the webhook path.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Candle counts (e.g. 1000 10000000)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--webhook-requests", type=int, default=2000)
+    parser.add_argument("--only", choices=["pipeline", "sheet", "webhook"], nargs="+",
+                        default=["pipeline", "sheet", "webhook"])
+    parser.add_argument("--output", default=None, help="JSON results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    # The measured code logs at INFO on every call; keep that out of the timings and the output
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    logging.getLogger().setLevel(logging.WARNING)
+    log.setLevel(logging.INFO)
+    meta = metadata()
+    results = []
+    for size in args.sizes:
+        if "pipeline" in args.only:
+            results.extend(bench_pipeline(size, args.repeat))
+        if "sheet" in args.only and size <= SHEET_MAX_ROWS:
+            results.extend(bench_sheet(size, args.repeat))
+    if "webhook" in args.only:
+        results.extend(bench_webhook(args.webhook_requests))
+
+    output = args.output or os.path.join("benchmarks", "results", f"{meta['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    log.info(f"Saved {len(results)} results to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+
+    def batch_update(self, body):
+        self.worksheet.calls["batch_update"] += 1
+        rows = self.worksheet.rows
+        for request in body["requests"]:
+            if "appendCells" in request:
+                for row in request["appendCells"]["rows"]:
+                    rows.append([cell["userEnteredValue"]["stringValue"] for cell in row["values"]])
+            elif "deleteDimension" in request:
+                span = request["deleteDimension"]["range"]
+                del rows[span["startIndex"]:span["endIndex"]]
+
+
+class FakeWorksheet:
+    """
+    In-memory stand-in for a gspread Worksheet, covering the calls made by
+    append_new_data and sheet_sync. Rows hold strings, like the Sheets API
+    returns them; `calls` counts API requests a real sheet would receive.
+    """
+
+    id = 0
+
+    def __init__(self, rows=None):
+        self.rows = [list(row) for row in rows or []]
+        self.spreadsheet = FakeSpreadsheet(self)
+        self.calls = dict.fromkeys(
+            ["get_all_values", "get_all_records", "row_values", "update", "append_rows", "delete_rows", "batch_update"], 0
+        )
+
+    @classmethod
+    def from_frame(cls, data):
+        return cls([data.columns.tolist()] + data.astype(str).values.tolist())
+
+    def get_all_values(self):
+        self.calls["get_all_values"] += 1
+        return [list(row) for row in self.rows]
+
+    def get_all_records(self):
+        self.calls["get_all_records"] += 1
+        if not self.rows:
+            return []
+        header = self.rows[0]
+        return [dict(zip(header, row)) for row in self.rows[1:]]
+
+    def row_values(self, row):
+        self.calls["row_values"] += 1
+        return list(self.rows[row - 1]) if 0 < row <= len(self.rows) else []
+
+    def update(self, values):
+        self.calls["update"] += 1
+        self.rows = [[str(value) for value in row] for row in values]
+
+    def append_rows(self, values):
+        self.calls["append_rows"] += 1
+        self.rows.extend([str(value) for value in row] for row in values)
+
+    def delete_rows(self, start, end=None):
+        self.calls["delete_rows"] += 1
+        del self.rows[start - 1:(end or start)]
+
+
+class GraphApiStub:
+    """
+    Local stand-in for the Graph API messages endpoint. Answers every POST with
+    200 and a message id after `latency` seconds, and records each message as
+    (perf_counter at receipt, recipient). Point WhatsAppDispatcher at `url`.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.received = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real endpoint
+
+            def do_POST(self):
+                received_at = time.perf_counter()
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if stub.latency:
+                    time.sleep(stub.latency)
+                with stub._lock:
+                    stub.received.append((received_at, body.get("to")))
+                    message_id = f"wamid.stub.{len(stub.received)}"
+                response = json.dumps({"messaging_product": "whatsapp", "messages": [{"id": message_id}]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="graph-api-stub", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def received_since(self, start):
+        """Receipt times of the messages received after perf_counter `start`."""
+        with self._lock:
+            return [received_at for received_at, _ in self.received if received_at >= start]
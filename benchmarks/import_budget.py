@@ -0,0 +1,53 @@
+import sys
+import json
+import argparse
+import subprocess
+
+# The analytics stack a webhook-only worker must never load
+HEAVY_MODULES = ["pandas", "numpy", "pandas_ta", "yfinance", "gspread", "google.oauth2", "aiohttp"]
+
+# Module -> import-time budget in milliseconds, measured in a fresh interpreter
+DEFAULT_BUDGETS = {
+    "silver_data": 50,
+    "app": 600,  # Flask itself is most of this
+}
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module, runs=3):
+    """Best-of-`runs` import time of `module` in fresh interpreters, plus the heavy modules it loaded."""
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return min(results, key=lambda result: result["ms"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if importing the web-facing packages is slow or loads the analytics stack.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget, e.g. on slow CI machines")
+    args = parser.parse_args()
+
+    failures = 0
+    for module, budget in DEFAULT_BUDGETS.items():
+        result = measure(module)
+        budget *= args.scale
+        ok = result["ms"] <= budget and not result["loaded"]
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} import {module:<12} {result['ms']:8.1f} ms (budget {budget:.0f} ms)"
+              + (f", loaded {', '.join(result['loaded'])}" if result["loaded"] else ""))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import sys
+import argparse
+
+import numpy as np
+
+from benchmarks.synthetic import generate_ohlcv
+
+# How the engine is primed before the frame under test is passed to calculate_indicators
+CASES = {
+    "cold": "fresh engine, whole frame at once",
+    "incremental": "engine warmed on all but the newest candle",
+    "forming": "engine warmed with a still-forming newest candle, then given its final values",
+}
+
+
+def engine_for(case, candles):
+    from silver_data.indicators import calculate_indicators
+    from silver_data.indicator_engine import IndicatorEngine
+
+    engine = IndicatorEngine()
+    if case == "incremental":
+        calculate_indicators(candles.iloc[:-1].copy(), engine=engine)
+    elif case == "forming":
+        forming = candles.copy()
+        forming.iloc[-1, forming.columns.get_loc("Close")] *= 1.01
+        forming.iloc[-1, forming.columns.get_loc("High")] *= 1.01
+        calculate_indicators(forming, engine=engine)
+    return engine
+
+
+def compare(expected, actual, columns, rtol, atol):
+    """Columns whose values differ beyond the tolerance, or whose NaNs are in different rows."""
+    failures = {}
+    for column in columns:
+        left = expected[column].to_numpy(dtype=float)
+        right = actual[column].to_numpy(dtype=float)
+        if not np.array_equal(np.isnan(left), np.isnan(right)):
+            failures[column] = "NaN positions differ"
+        elif not np.allclose(left, right, rtol=rtol, atol=atol, equal_nan=True):
+            failures[column] = f"max abs diff {np.nanmax(np.abs(left - right)):.3g}"
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fail if IndicatorEngine disagrees with the full pandas_ta recompute in calculate_indicators.")
+    parser.add_argument("--size", type=int, default=5000, help="Synthetic candles per check")
+    parser.add_argument("--seeds", type=int, default=3, help="Number of synthetic series")
+    parser.add_argument("--rtol", type=float, default=1e-6)
+    parser.add_argument("--atol", type=float, default=1e-8)
+    args = parser.parse_args()
+
+    # pandas_ta is only needed for the reference values, not to import this module
+    from silver_data.indicators import calculate_indicators
+    from silver_data.indicator_engine import INDICATOR_COLUMNS
+
+    failures = 0
+    for seed in range(args.seeds):
+        candles = generate_ohlcv(args.size, seed=seed)
+        expected = calculate_indicators(candles.copy())
+        for case, description in CASES.items():
+            actual = calculate_indicators(candles.copy(), engine=engine_for(case, candles))
+            differences = compare(expected, actual, INDICATOR_COLUMNS, args.rtol, args.atol)
+            failures += bool(differences)
+            print(f"{'FAIL' if differences else 'ok  '} seed={seed} {case:<12} ({description})"
+                  + "".join(f"\n       {column}: {reason}" for column, reason in differences.items()))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
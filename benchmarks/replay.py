@@ -0,0 +1,188 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+import pandas as pd
+
+from benchmarks.bench import metadata, percentiles
+from benchmarks.fakes import FakeWorksheet, GraphApiStub
+from benchmarks.synthetic import generate_ohlcv
+
+CANDLE_SECONDS = 15 * 60
+HISTORY = 60 * 96  # The 60-day window fetch_silver_data returns
+STAGES = ["auth", "fetch", "analyze", "append", "publish"]
+RECIPIENTS = ["919900000001", "919900000002"]
+
+log = logging.getLogger("benchmarks")
+
+
+def load_candles(args):
+    """Recorded candles from a CandleStore directory or a CSV file, else synthetic ones."""
+    if args.store:
+        from silver_data.candle_store import CandleStore
+        candles = CandleStore(args.store).read(args.symbol, "15m")
+    elif args.csv:
+        candles = pd.read_csv(args.csv)
+        candles["Datetime"] = pd.to_datetime(candles["Datetime"], utc=True).dt.tz_convert("America/New_York")
+    else:
+        candles = generate_ohlcv(args.history + args.candles, seed=args.seed)
+    if len(candles) <= args.history:
+        raise SystemExit(f"Need more than {args.history} candles to replay, got {len(candles)}")
+    return candles.reset_index(drop=True)
+
+
+def configure_environment(directory, graph_url):
+    """Points run.py's state files, recipients and Graph API calls at local stand-ins; must run before importing it."""
+    os.environ.update({
+        "CANDLE_STORE_DIR": os.path.join(directory, "candle_store"),
+        "SHEET_SYNC_STATE": os.path.join(directory, "sheet_sync_state.json"),
+        "TRADE_LEDGER_DB": os.path.join(directory, "trade_ledger.db"),
+        "THREAD_STORE_DB": os.path.join(directory, "threads.db"),
+        "GOOGLE_CREDENTIALS": os.environ.get("GOOGLE_CREDENTIALS", "{}"),  # Never read: the sheet is faked
+        "GRAPH_API_URL": graph_url,
+        "ACCESS_TOKEN": "replay",
+        "PHONE_NUMBER_ID": "replay",
+        "VERSION": "v18.0",
+        "RECIPIENT_WAID": RECIPIENTS[0],
+        "RECIPIENT_WAID1": RECIPIENTS[1],
+    })
+
+
+def replay(candles, history, speedup, graph):
+    """
+    Feeds candles[history:] through run.processing_data and the WhatsApp broadcast,
+    one candle at a time. Candle i is released when its close falls due on a clock
+    running `speedup` times faster than real time (0 = no waiting); its latency
+    counts from that release, so a run that overruns delays the next candle's
+    processing the way it would in production.
+    """
+    import run
+    from start import main_function
+    from silver_data.pipeline import MarketPipeline, PRIMARY_MARKET
+    from silver_data.sheet_sync import SheetSyncState
+    from app.services.metrics import pipeline_stage_seconds
+    from app.services.snapshot_bus import snapshot_bus, thaw
+
+    class ReplayPipeline(MarketPipeline):
+        position = history
+
+        def fetch(self):
+            return {PRIMARY_MARKET: candles.iloc[max(0, self.position - history):self.position].copy()}
+
+    run.setup()
+    worksheet = FakeWorksheet()
+    run.authenticate_google_sheets = lambda *args, **kwargs: worksheet
+    run.sheet_sync_state = SheetSyncState(os.environ["SHEET_SYNC_STATE"])
+    run.market_pipeline = pipeline = ReplayPipeline(markets=[PRIMARY_MARKET])
+
+    def process():
+        before = {stage: pipeline_stage_seconds.totals(stage=stage)[1] for stage in STAGES}
+        try:
+            run.processing_data()
+        except Exception:
+            pass  # Failed runs publish an error snapshot, counted in the report
+        seconds = {stage: pipeline_stage_seconds.totals(stage=stage)[1] - before[stage] for stage in STAGES}
+        # What run.whatsapp_bot does with each new snapshot
+        snapshot = snapshot_bus.latest()
+        start = time.perf_counter()
+        if "trend" in snapshot.data:
+            main_function(thaw(snapshot.data))
+        seconds["whatsapp"] = time.perf_counter() - start
+        return seconds, snapshot.data
+
+    # Warm-up on the history alone: builds the indicator engines and sends the intro messages
+    process()
+
+    samples = []
+    opened_at = candles["Datetime"].iloc[history]
+    clock_start = time.perf_counter()
+    try:
+        for position in range(history + 1, len(candles) + 1):
+            # The candle at position - 1 closes one interval after it opened
+            due = (candles["Datetime"].iloc[position - 1] - opened_at).total_seconds() + CANDLE_SECONDS
+            released = clock_start + due / speedup if speedup else time.perf_counter()
+            wait = released - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+
+            pipeline.position = position
+            seconds, data = process()
+            received = graph.received_since(released)
+            sample = dict(seconds, candle=str(candles["Datetime"].iloc[position - 1]), messages=len(received),
+                          error=data.get("error"))
+            if received:
+                sample["first_message"] = min(received) - released
+                sample["end_to_end"] = max(received) - released
+            samples.append(sample)
+    finally:
+        run.app.extensions["webhook_queue"].stop(timeout=5)
+    return samples
+
+
+def report(samples):
+    results = []
+    for name in STAGES + ["whatsapp", "first_message", "end_to_end"]:
+        values = [sample[name] for sample in samples if sample.get(name) is not None]
+        if not values:
+            continue
+        result = dict(name=name, size=len(values), **percentiles(values))
+        results.append(result)
+        log.info(f"{name:<16} n={len(values):<6} p50={result['p50_ms']:9.2f} ms "
+                 f"p90={result['p90_ms']:9.2f} ms p99={result['p99_ms']:9.2f} ms")
+    errors = [sample for sample in samples if sample["error"]]
+    silent = sum(1 for sample in samples if not sample["messages"])
+    if errors:
+        log.warning(f"{len(errors)} runs failed, first: {errors[0]['error']}")
+    log.info(f"{len(samples)} candles replayed, {silent} without a message (snapshot unchanged or failed)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay recorded 15m candles through processing_data and the WhatsApp broadcast, "
+                    "against a fake sheet and a local Graph API stub, and report the latency from candle close.")
+    parser.add_argument("--store", default=None, help="CandleStore directory to replay from")
+    parser.add_argument("--csv", default=None, help="CSV with Datetime and OHLCV columns to replay from")
+    parser.add_argument("--symbol", default="SI=F", help="Symbol to read from --store")
+    parser.add_argument("--candles", type=int, default=200, help="Synthetic candles to replay after the history")
+    parser.add_argument("--history", type=int, default=HISTORY, help="Candles already known when the replay starts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--speedup", type=float, default=900, help="Replay clock speed-up; 0 replays back to back")
+    parser.add_argument("--graph-latency", type=float, default=0.05, help="Stub Graph API response time (seconds)")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Exit 1 if end-to-end p99 exceeds this")
+    parser.add_argument("--output", default=None, help="JSON results file (default benchmarks/results/replay-<commit>.json)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    logging.getLogger().setLevel(logging.WARNING)
+    log.setLevel(logging.INFO)
+
+    candles = load_candles(args)
+    graph = GraphApiStub(latency=args.graph_latency).start()
+    with tempfile.TemporaryDirectory() as directory:
+        configure_environment(directory, graph.url)
+        try:
+            samples = replay(candles, args.history, args.speedup, graph)
+        finally:
+            graph.stop()
+    results = report(samples)
+
+    meta = dict(metadata(), speedup=args.speedup, history=args.history, graph_latency=args.graph_latency)
+    output = args.output or os.path.join("benchmarks", "results", f"replay-{meta['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"meta": meta, "results": results, "samples": samples}, f, indent=2)
+    log.info(f"Saved replay results to {output}")
+
+    end_to_end = next((result for result in results if result["name"] == "end_to_end"), None)
+    if args.budget_ms is not None and (end_to_end is None or end_to_end["p99_ms"] > args.budget_ms):
+        log.error(f"End-to-end p99 over budget of {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
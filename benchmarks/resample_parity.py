@@ -0,0 +1,92 @@
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_ohlcv
+
+AGGREGATION = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+COLUMNS = list(AGGREGATION)
+TZ = "America/New_York"
+
+
+def expected_bars(candles, timeframe):
+    """
+    Reference bars: DataFrame.resample for 1h and 1d. For 4h, resample drifts an hour
+    after a DST change, so the reference groups on New York wall-clock 4h blocks.
+    """
+    data = candles.set_index("Datetime")[COLUMNS]
+    if timeframe != "4h":
+        rule = {"1h": "1h", "1d": "1D"}[timeframe]
+        return data.resample(rule).agg(AGGREGATION).dropna()
+    wall = data.index.tz_localize(None)
+    bars = data.groupby(wall.floor("4h")).agg(AGGREGATION)
+    # Label each block with its first candle's offset, as bucket_keys does
+    first = data.index.to_series().groupby(wall.floor("4h")).first()
+    offsets = first.dt.tz_localize(None) - first.dt.tz_convert("UTC").dt.tz_localize(None)
+    bars.index = (bars.index - offsets.to_numpy()).tz_localize("UTC").tz_convert(TZ)
+    return bars
+
+
+def replay(candles, timeframes, seed):
+    """
+    Feeds the candles through TimeframeResampler in random-sized batches, like
+    successive fetches. Each batch re-sends the previous newest candle and first
+    delivers its own newest candle with provisional values, which are then
+    replaced in place, as a still-forming candle would be.
+    """
+    from silver_data.candle_buffer import CandleRingBuffer
+    from silver_data.candle_store import _to_records
+    from silver_data.resample import TimeframeResampler
+
+    records = _to_records(candles)
+    source = CandleRingBuffer(len(records))
+    resamplers = {timeframe: TimeframeResampler(timeframe, len(records)) for timeframe in timeframes}
+    rng = np.random.default_rng(seed)
+    position = 0
+    while position < len(records):
+        step = int(rng.integers(1, 50))
+        batch = records[max(0, position - 1):position + step].copy()
+        forming = batch[-1:].copy()
+        forming["Close"] += 1
+        forming["High"] += 5
+        for chunk in (np.concatenate([batch[:-1], forming]), batch[-1:]):
+            source.extend(chunk)
+            for resampler in resamplers.values():
+                resampler.update(source)
+        position += step
+    return {timeframe: resampler.window().to_frame().set_index("Datetime") for timeframe, resampler in resamplers.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fail if incrementally resampled 1h/4h/1d bars differ from a full resample of the 15m candles.")
+    parser.add_argument("--start", default="2023-10-01", help="First candle; the default spans both DST changes")
+    parser.add_argument("--size", type=int, default=20_000, help="Synthetic 15m candles")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    candles = generate_ohlcv(args.size, seed=args.seed)
+    candles["Datetime"] = pd.date_range(args.start, periods=len(candles), freq="15min", tz=TZ)
+    timeframes = ["1h", "4h", "1d"]
+    actual = replay(candles, timeframes, args.seed)
+
+    failures = 0
+    for timeframe in timeframes:
+        expected = expected_bars(candles, timeframe)
+        got = actual[timeframe][COLUMNS]
+        problem = None
+        if len(expected) != len(got):
+            problem = f"{len(got)} bars, expected {len(expected)}"
+        elif not (expected.index == got.index).all():
+            problem = f"first differing bar at {expected.index[(expected.index != got.index).argmax()]}"
+        elif not np.allclose(expected.to_numpy(dtype=float), got.to_numpy(dtype=float)):
+            problem = "OHLCV values differ"
+        failures += problem is not None
+        print(f"{'FAIL' if problem else 'ok  '} {timeframe:<3} {len(got)} bars" + (f": {problem}" if problem else ""))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,110 +1,199 @@
 import logging
-import numpy as np  # Import numpy for conversion
+import os
 from threading import Thread
-from flask import Flask, jsonify
+from flask import Response, jsonify, request
 from app import create_app
-from silver_data import fetch_silver_data, append_new_data, authenticate_google_sheets
-from silver_data import calculate_indicators
-from silver_data import identify_trend_signals
-from start import main_function  # WhatsApp bot function
-import time
+from silver_data import append_new_data, authenticate_google_sheets, reset_google_sheets
+from silver_data.candle_store import CandleStore
+from silver_data.sheet_sync import SheetSyncState
+from silver_data.pipeline import MarketPipeline, PRIMARY_MARKET, market_key
+from app.services.scheduler import PipelineScheduler
+from app.services.snapshot_bus import snapshot_bus, thaw
+from app.utils.snapshot_http import conditional_json, encode_snapshot, resume_version, sse_stream
+from app.services.metrics import (
+    pipeline_stage_seconds, pipeline_market_stage_seconds, pipeline_rows_fetched_total, sheet_rows_appended_total,
+)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# Google Sheets credentials and sheet ID
-CREDENTIALS_FILE = "credentials.json"
+# Google Sheets ID; credentials come from the GOOGLE_CREDENTIALS environment variable
 SHEET_ID = "1ijoaNSyspC__vPRo7c2bdr5R5lVLNh-27w_BEnarN_Q"
+SHEET_ROW_BUDGET = int(os.getenv("SHEET_ROW_BUDGET", "6000"))  # Data rows kept in the sheet
 
-# Create Flask app
-app = create_app()
-
-# Store the latest processed data globally
-latest_data = {"trend": "Processing not started yet."}
+# Built by setup(), not at import, so importing this module has no side effects
+app = None
+candle_store = None  # Local candle history so each run only downloads candles after the last stored one
+sheet_sync_state = None  # High-water mark of the sheet so each run appends without reading the sheet back
+market_pipeline = None  # Every configured (symbol, interval) and its derived timeframes
+scheduler = None  # Runs processing_data shortly after each 15m candle closes, one run at a time
 
 # Flag to control the loop
 processing_active = True  # Allows stopping if needed in the future
 
+class PipelineRunError(RuntimeError):
+    """A run that published an error snapshot; the scheduler marks its job as failed."""
+
+
 def processing_data():
-    """Fetches and processes silver market data before starting WhatsApp messages."""
-    global latest_data
+    """
+    Fetches and processes silver market data and publishes the result as a new snapshot.
+    A failed run still publishes its error snapshot, then raises so the job is marked failed.
+    """
+    latest_data = {"error": "Processing did not complete"}
     with app.app_context():
         try:
             logging.info("Authenticating Google Sheets...")
-            worksheet = authenticate_google_sheets(CREDENTIALS_FILE, SHEET_ID)
+            with pipeline_stage_seconds.time(stage="auth"):
+                worksheet = authenticate_google_sheets(SHEET_ID)  # Cached after the first run
             
-            logging.info("Fetching new silver data from yfinance...")
-            new_data = fetch_silver_data()
+            logging.info("Fetching market data from yfinance...")
+            with pipeline_stage_seconds.time(stage="fetch"):
+                frames = market_pipeline.fetch()
+            for market, frame in frames.items():
+                if frame is not None:
+                    pipeline_rows_fetched_total.inc(len(frame), market=market_key(*market))
+
+            with pipeline_stage_seconds.time(stage="analyze"):
+                results = market_pipeline.analyze(frames)
+            markets = {market_key(*market): summary for market, (summary, _) in results.items()}
+            for market, (_, frame) in results.items():
+                for stage, seconds in (frame.attrs.get("stage_seconds", {}) if frame is not None else {}).items():
+                    pipeline_market_stage_seconds.observe(seconds, market=market_key(*market), stage=stage)
+
+            market_trend, new_data = results.get(PRIMARY_MARKET, ({}, None))
             if new_data is None or new_data.empty:
                 logging.error("Failed to fetch new data from yfinance.")
-                latest_data = {"error": "Failed to fetch new data from yfinance"}
-                return  # Stop if fetching fails
-            
-            logging.info("Calculating indicators...")
-            new_data = calculate_indicators(new_data)
-            if new_data is None:
-                logging.error("Failed to calculate indicators.")
-                latest_data = {"error": "Failed to calculate indicators"}
-                return  # Stop if calculation fails
-
-            logging.info("Checking Trend...")
-            market_trend = identify_trend_signals(new_data)
-            # Convert numpy types to Python types for JSON compatibility
-            latest_data = {
-                key: (int(value) if isinstance(value, np.integer) else
-                      float(value) if isinstance(value, np.floating) else
-                      value)
-                for key, value in market_trend.items()
-            }
+                latest_data = {"error": "Failed to fetch new data from yfinance", "markets": markets}
+                raise PipelineRunError(latest_data["error"])  # Stop if fetching fails
+
+            # The primary market stays at the top level for the WhatsApp bot, next to
+            # its symbol's summary on every timeframe for multi-timeframe confirmation
+            timeframes = {interval: summary for (symbol, interval), (summary, _) in results.items()
+                          if symbol == PRIMARY_MARKET[0]}
+            latest_data = dict(market_trend, markets=markets, timeframes=timeframes)
 
             logging.info("Appending new data to Google Sheets...")
-            success = append_new_data(worksheet, new_data)
+            with pipeline_stage_seconds.time(stage="append"):
+                success = append_new_data(worksheet, new_data, sync_state=sheet_sync_state, max_rows=SHEET_ROW_BUDGET)
+            sheet_rows_appended_total.inc(sheet_sync_state.appended_rows)
             if not success:
                 logging.error("Failed to append new data to Google Sheets.")
                 latest_data["error"] = "Failed to append new data to Google Sheets"
-            else:
-                logging.info("Successfully appended data to Google Sheets.")
+                raise PipelineRunError(latest_data["error"])
+            logging.info("Successfully appended data to Google Sheets.")
+
+        except PipelineRunError:
+            raise  # Already logged, and latest_data holds the error
 
         except Exception as e:
             logging.error(f"An unexpected error occurred: {e}")
             latest_data = {"error": str(e)}
+            reset_google_sheets()  # Re-open the worksheet next run in case it changed
+            raise
+
+        finally:
+            # Hand the result to the Flask routes and the WhatsApp bot
+            with pipeline_stage_seconds.time(stage="publish"):
+                snapshot_bus.publish(latest_data)
 
 
 def whatsapp_bot():
-    """Starts WhatsApp bot after processing data."""
+    """Starts WhatsApp bot after processing data and sends every new snapshot."""
+    from start import main_function  # WhatsApp bot function; loads .env on import
+
     logging.info("Starting WhatsApp bot after processing data...")
+    version = 0
     while processing_active:
+        snapshot = snapshot_bus.wait_for_newer(version, timeout=600)
+        if snapshot is None:
+            continue  # No new data yet
+        version = snapshot.version
+
+        if "trend" not in snapshot.data:
+            logging.warning(f"Skipping WhatsApp message for failed run: {snapshot.data.get('error')}")
+            continue
+
         try:
             logging.info("Sending WhatsApp message...")
-            main_function()  # Call WhatsApp bot function
+            main_function(thaw(snapshot.data))  # Call WhatsApp bot function
         except Exception as e:
             logging.error(f"Error in WhatsApp bot: {e}")
 
-        time.sleep(600)  # Wait 10 minutes before sending the next message
-
-# Flask routes
-@app.route("/")
+# Flask routes, registered by setup()
 def home():
     return "Flask app is running!"
 
-@app.route("/get-data", methods=["GET"])
 def get_processed_data():
-    return jsonify(latest_data)
+    # Optional ?symbol=GC=F&interval=4h selects a single market; 1h, 4h and 1d are derived from 15m
+    snapshot = snapshot_bus.latest()
+    path = ()
+    symbol = request.args.get("symbol")
+    if symbol:
+        key = market_key(symbol, request.args.get("interval", PRIMARY_MARKET[1]))
+        if key not in snapshot.data.get("markets", {}):
+            return jsonify({"status": "error", "message": f"Unknown market {key}"}), 404
+        path = ("markets", key)
+
+    # Serialized once per snapshot; unchanged snapshots answer 304 Not Modified
+    body, etag = encode_snapshot(snapshot, path)
+    return conditional_json(body, etag)
+
+def stream_data():
+    # Server-Sent Events: pushes every new snapshot; resumes after Last-Event-ID
+    last_version = resume_version(request.headers.get("Last-Event-ID"))
+    return Response(
+        sse_stream(snapshot_bus, last_version),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-@app.route("/process-data", methods=["GET"])
 def trigger_processing():
-    return jsonify({"message": "Data processing is running."})
+    job_id = scheduler.trigger("manual")
+    return jsonify({"message": "Data processing queued.", "job_id": job_id}), 202
+
+def processing_status(job_id):
+    job = scheduler.status(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job id"}), 404
+    return jsonify(job)
+
+
+def setup():
+    """Builds the Flask app, the pipeline state and the scheduler once; returns the app."""
+    global app, candle_store, sheet_sync_state, market_pipeline, scheduler
+    if app is not None:
+        return app
+
+    candle_store = CandleStore(os.getenv("CANDLE_STORE_DIR", "candle_store"))
+    sheet_sync_state = SheetSyncState(os.getenv("SHEET_SYNC_STATE", "sheet_sync_state.json"))
+    market_pipeline = MarketPipeline(store=candle_store)
+    scheduler = PipelineScheduler(
+        processing_data,
+        interval_minutes=15,
+        delay_seconds=int(os.getenv("PIPELINE_DELAY_SECONDS", "30")),
+    )
+
+    app = create_app()
+    app.add_url_rule("/", view_func=home)
+    app.add_url_rule("/get-data", view_func=get_processed_data, methods=["GET"])
+    app.add_url_rule("/stream", view_func=stream_data, methods=["GET"])
+    app.add_url_rule("/process-data", view_func=trigger_processing, methods=["GET", "POST"])
+    app.add_url_rule("/process-data/<job_id>", view_func=processing_status, methods=["GET"])
+    return app
+
 
 if __name__ == "__main__":
     logging.info("Starting Flask app...")
+    setup()
 
-    # Run processing first, then WhatsApp bot
-    processing_thread = Thread(target=processing_data)
-    processing_thread.start()
-    processing_thread.join()  # Wait until processing is done
+    # Run processing first, then keep it running after every candle close
+    scheduler.start()
+    scheduler.wait(scheduler.trigger("startup"))  # Wait until processing is done
 
     # Start WhatsApp bot after data is processed
     whatsapp_thread = Thread(target=whatsapp_bot, daemon=True)
     whatsapp_thread.start()
 
-    app.run(host="0.0.0.0", port=8000, debug=True)
+    # The reloader would start a second scheduler in the child process
+    app.run(host="0.0.0.0", port=8000, debug=True, use_reloader=False)
@@ -1,4 +1,30 @@
-from silver_data.silver_data import fetch_silver_data, append_new_data, authenticate_google_sheets
-from silver_data.indicators import calculate_indicators
-from silver_data.Indicator_signal import generate_signals
-from silver_data.trend import identify_trend_signals
+# The package facade is lazy (PEP 562): submodules, and with them yfinance, gspread,
+# pandas and pandas_ta, are imported on first attribute access, not on `import silver_data`.
+import importlib
+
+_EXPORTS = {
+    "fetch_silver_data": "silver_data.silver_data",
+    "append_new_data": "silver_data.silver_data",
+    "authenticate_google_sheets": "silver_data.silver_data",
+    "reset_google_sheets": "silver_data.silver_data",
+    "calculate_indicators": "silver_data.indicators",
+    "generate_signals": "silver_data.Indicator_signal",
+    "generate_signal_variants": "silver_data.Indicator_signal",
+    "identify_trend_signals": "silver_data.trend",
+    "CandleRingBuffer": "silver_data.candle_buffer",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
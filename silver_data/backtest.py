@@ -0,0 +1,303 @@
+import json
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from silver_data.Indicator_signal import generate_signals
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+TREND_WINDOW = 48  # identify_trend_signals looks at the last 48 candles
+
+
+def ffill(values, axis=-1):
+    """Forward-fills NaNs along `axis` without a Python loop."""
+    values = np.moveaxis(np.asarray(values, dtype=float), axis, -1)
+    index = np.where(np.isnan(values), 0, np.arange(values.shape[-1]))
+    np.maximum.accumulate(index, axis=-1, out=index)
+    filled = np.take_along_axis(values, index, axis=-1)
+    return np.moveaxis(filled, -1, axis)
+
+
+def ewm(values, span):
+    """pandas ewm(span=span, adjust=False).mean() over the last axis."""
+    values = np.asarray(values, dtype=float)
+    flat = values.reshape(-1, values.shape[-1])
+    result = pd.DataFrame(flat.T).ewm(span=span, adjust=False).mean().to_numpy().T
+    return result.reshape(values.shape)
+
+
+def windowed_ewm(values, span, window=TREND_WINDOW):
+    """
+    For every candle t, the adjust=False EWM that identify_trend_signals gets by
+    restarting the average at the start of its window (t - window + 1).
+
+    The restarted average differs from the full-history one by a term that decays
+    geometrically from the window start, so it is a shifted correction of one
+    full-series pass instead of one pass per window.
+    """
+    full = ewm(values, span)
+    decay = (1 - 2.0 / (span + 1)) ** (window - 1)
+    result = np.full(full.shape, np.nan)
+    lag = window - 1
+    result[..., lag:] = full[..., lag:] - decay * (full[..., :-lag] - values[..., :-lag])
+    return result, full
+
+
+def _geometric_ewm(decay, span, window=TREND_WINDOW):
+    # EWM (adjust=False) of the sequence decay**j, j = 0..window-1, at its last element
+    alpha = 2.0 / (span + 1)
+    value = 1.0
+    for j in range(1, window):
+        value = alpha * decay ** j + (1 - alpha) * value
+    return value
+
+
+def windowed_macd(close, short_window=6, long_window=13, signal_window=5, window=TREND_WINDOW):
+    """
+    MACD line and signal of calculate_macd as seen by identify_trend_signals on
+    every window of `window` candles, computed for all candles at once.
+    """
+    close = np.asarray(close, dtype=float)
+    lag = window - 1
+    short_decay = 1 - 2.0 / (short_window + 1)
+    long_decay = 1 - 2.0 / (long_window + 1)
+    signal_decay = 1 - 2.0 / (signal_window + 1)
+
+    short_ema = ewm(close, short_window)
+    long_ema = ewm(close, long_window)
+    full_macd = short_ema - long_ema
+    full_signal = ewm(full_macd, signal_window)
+
+    # How far each full-history EMA is from the restarted one at the window start
+    short_offset = short_ema[..., :-lag] - close[..., :-lag]
+    long_offset = long_ema[..., :-lag] - close[..., :-lag]
+
+    macd_line = np.full(full_macd.shape, np.nan)
+    macd_signal = np.full(full_macd.shape, np.nan)
+    macd_line[..., lag:] = (
+        full_macd[..., lag:]
+        - short_decay ** lag * short_offset
+        + long_decay ** lag * long_offset
+    )
+    macd_signal[..., lag:] = (
+        full_signal[..., lag:]
+        - signal_decay ** lag * (full_signal[..., :-lag] - full_macd[..., :-lag])
+        - _geometric_ewm(short_decay, signal_window, window) * short_offset
+        + _geometric_ewm(long_decay, signal_window, window) * long_offset
+    )
+    return macd_line, macd_signal
+
+
+def rolling_extreme(values, length, func):
+    values = np.asarray(values, dtype=float)
+    result = np.full(values.shape, np.nan)
+    if values.shape[-1] >= length:
+        windows = np.lib.stride_tricks.sliding_window_view(values, length, axis=-1)
+        result[..., length - 1:] = func(windows, axis=-1)
+    return result
+
+
+def trend_signal_frame(data, trend_threshold=0.4, ema_span=3, short_window=6, long_window=13,
+                       signal_window=5, buy_support=1.03, sell_resistance=0.97,
+                       stop_support=0.98, stop_resistance=1.02):
+    """
+    Evaluates identify_trend_signals as of every candle, vectorized.
+
+    Row t holds what identify_trend_signals(data.iloc[:t + 1]) would report; the
+    first 47 rows, which have less than a full window, are left without signals.
+    """
+    close = data["Close"].to_numpy(dtype=float)
+    high = data["High"].to_numpy(dtype=float)
+    low = data["Low"].to_numpy(dtype=float)
+    lag = TREND_WINDOW - 1
+
+    price_change_pct = np.full(len(close), np.nan)
+    price_change_pct[lag:] = (close[lag:] - close[:-lag]) / close[:-lag] * 100
+    trend = np.where(price_change_pct > trend_threshold, 1, np.where(price_change_pct < -trend_threshold, -1, 0))
+
+    support = np.round(rolling_extreme(low, 3, np.min), 2)
+    resistance = np.round(rolling_extreme(high, 3, np.max), 2)
+    macd_line, macd_signal = windowed_macd(close, short_window, long_window, signal_window)
+    ema, _ = windowed_ewm(close, ema_span)
+
+    buy = (macd_line > macd_signal) & (close <= support * buy_support)
+    sell = (macd_line < macd_signal) & (close >= resistance * sell_resistance)
+    short = buy & (close < support * stop_support)
+    exit_ = sell & (close > resistance * stop_resistance)
+
+    return pd.DataFrame({
+        "trend": np.where(np.isnan(price_change_pct), 0, trend),
+        "price_change_pct": price_change_pct,
+        "nearest_support": support,
+        "nearest_resistance": resistance,
+        "macd_line": macd_line,
+        "macd_signal": macd_signal,
+        "5_EMA": ema,
+        "buy": buy,
+        "sell": sell,
+        "short": short,
+        "exit": exit_,
+    }, index=data.index)
+
+
+def signal_positions(signal, allow_short=False):
+    """Target position after each candle from generate_signals' 1 / -1 / 0 column."""
+    signal = np.asarray(signal, dtype=float)
+    if allow_short:
+        raw = np.where(signal != 0, signal, np.nan)
+    else:
+        raw = np.where(signal == 1, 1.0, np.where(signal == -1, 0.0, np.nan))
+    return np.nan_to_num(ffill(raw), nan=0.0)
+
+
+def trend_positions(signals, close, stop_support=0.98, stop_resistance=1.02, allow_short=False):
+    """
+    Target position after each candle from trend_signal_frame.
+
+    BUY opens a long, SELL closes it (or opens a short when allowed). The stop of an
+    open long is nearest_support * stop_support as of its latest BUY signal and the
+    position is closed when a candle closes below it; shorts mirror this above
+    nearest_resistance * stop_resistance.
+    """
+    buy = np.asarray(signals["buy"], dtype=bool)
+    sell = np.asarray(signals["sell"], dtype=bool)
+    support = np.asarray(signals["nearest_support"], dtype=float)
+    resistance = np.asarray(signals["nearest_resistance"], dtype=float)
+    close = np.asarray(close, dtype=float)
+
+    long_stop = ffill(np.where(buy, support * stop_support, np.nan))
+    short_stop = ffill(np.where(sell, resistance * stop_resistance, np.nan))
+
+    raw = np.full(buy.shape, np.nan)
+    raw[buy] = 1.0
+    raw[sell] = -1.0 if allow_short else 0.0
+    stopped_long = close < long_stop
+    stopped_short = close > short_stop
+    raw[buy & stopped_long] = 0.0
+    if allow_short:
+        raw[sell & stopped_short] = 0.0
+
+    position = np.nan_to_num(ffill(raw), nan=0.0)
+
+    # Stops apply between signals too: flatten from the first stopped candle to the next signal
+    stopped = ((position > 0) & stopped_long) | ((position < 0) & stopped_short)
+    signal_id = np.cumsum(~np.isnan(raw), axis=-1)
+    first_stop = ffill(np.where(stopped, signal_id, np.nan))
+    position[first_stop == signal_id] = 0.0
+    return position
+
+
+def simulate(open_, close, position, fee_bps=2.0):
+    """
+    Vectorized fill simulation.
+
+    `position` is the target position after each candle's close (1 long, -1 short,
+    0 flat); it is filled at the next candle's open and everything still open is
+    closed at the last close. `fee_bps` is charged on every fill. `position` may be
+    2-D (one row per strategy variant) and the statistics are then arrays.
+    """
+    open_ = np.asarray(open_, dtype=float)
+    close = np.asarray(close, dtype=float)
+    position = np.asarray(position, dtype=float)
+    fee = fee_bps / 10000.0
+
+    # Fill prices: every candle's open, plus the final close for the forced exit
+    prices = np.append(open_, close[-1])
+    bar_returns = prices[1:] / prices[:-1] - 1
+
+    leading = np.zeros(position.shape[:-1] + (1,))
+    held = np.concatenate([leading, position[..., :-1], leading], axis=-1)  # held[t] is held during candle t
+    turnover = np.abs(np.diff(held, axis=-1, prepend=0.0))
+
+    strategy_returns = held[..., :-1] * bar_returns - fee * turnover[..., :-1]
+    equity = np.cumprod(1 + strategy_returns, axis=-1)
+    equity *= 1 - fee * turnover[..., -1:]  # Forced exit after the last candle
+    drawdown = 1 - equity / np.maximum.accumulate(equity, axis=-1)
+
+    # A trade opens where the held position changes to non-zero and closes where a
+    # non-zero position changes; pair each close with the price at the latest open.
+    previous = held[..., :-1]
+    current = held[..., 1:]
+    opened = (current != 0) & (current != previous)
+    closed = (previous != 0) & (current != previous)
+    fill_prices = np.broadcast_to(prices[1:], current.shape)
+    entry_prices = ffill(np.where(opened, fill_prices, np.nan))
+    entry_prices = np.concatenate([np.full(leading.shape, np.nan), entry_prices[..., :-1]], axis=-1)
+    trade_returns = np.where(closed, (1 + previous * (fill_prices / entry_prices - 1)) * (1 - fee) ** 2 - 1, np.nan)
+    trade_pnl = np.where(closed, previous * (fill_prices - entry_prices) - fee * (fill_prices + entry_prices), np.nan)
+
+    trades = closed.sum(axis=-1)
+    wins = (trade_returns > 0).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        win_rate = np.where(trades > 0, wins / np.maximum(trades, 1), np.nan)
+
+    return {
+        "pnl": np.nansum(trade_pnl, axis=-1),
+        "total_return_pct": (equity[..., -1] - 1) * 100,
+        "max_drawdown_pct": drawdown.max(axis=-1) * 100,
+        "win_rate": win_rate,
+        "trades": trades,
+        "exposure_pct": (held[..., :-1] != 0).mean(axis=-1) * 100,
+    }
+
+
+def _report(stats):
+    return {key: (value.item() if isinstance(value, np.generic) else
+                  value.tolist() if isinstance(value, np.ndarray) else value)
+            for key, value in stats.items()}
+
+
+def backtest_signals(data, fee_bps=2.0, allow_short=False):
+    """Backtests generate_signals on a frame that already has the indicator columns."""
+    data = generate_signals(data.copy())
+    if "signal" not in data.columns:
+        return None
+    position = signal_positions(data["signal"], allow_short)
+    return _report(simulate(data["Open"], data["Close"], position, fee_bps))
+
+
+def backtest_trend(data, fee_bps=2.0, allow_short=False, **params):
+    """Backtests identify_trend_signals, including its stop-loss rules; params go to trend_signal_frame."""
+    signals = trend_signal_frame(data, **params)
+    position = trend_positions(
+        signals, data["Close"],
+        stop_support=params.get("stop_support", 0.98),
+        stop_resistance=params.get("stop_resistance", 1.02),
+        allow_short=allow_short,
+    )
+    return _report(simulate(data["Open"], data["Close"], position, fee_bps))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the signal logic on stored candle history.")
+    parser.add_argument("--store", default="candle_store", help="CandleStore directory")
+    parser.add_argument("--symbol", default="SI=F")
+    parser.add_argument("--interval", default="15m")
+    parser.add_argument("--start", default=None)
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--fee-bps", type=float, default=2.0)
+    parser.add_argument("--allow-short", action="store_true")
+    args = parser.parse_args()
+
+    from silver_data.candle_store import CandleStore
+    from silver_data.indicators import calculate_indicators
+
+    data = CandleStore(args.store).read(args.symbol, args.interval, start=args.start, end=args.end)
+    if data.empty:
+        logging.error(f"No stored candles for {args.symbol} ({args.interval}).")
+        return
+
+    logging.info(f"Backtesting {len(data)} candles of {args.symbol} ({args.interval})...")
+    data = calculate_indicators(data)
+    report = {
+        "generate_signals": backtest_signals(data, args.fee_bps, args.allow_short),
+        "identify_trend_signals": backtest_trend(data, args.fee_bps, args.allow_short),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
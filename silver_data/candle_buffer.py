@@ -0,0 +1,134 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from silver_data.candle_store import DEFAULT_TZ, PRICE_COLUMNS, _to_records
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class CandleWindow:
+    """
+    Read-only, zero-copy view of the newest candles of a CandleRingBuffer.
+
+    Columns are indexed like a DataFrame (`window["Close"]`) but are NumPy
+    views into the buffer, so they are only valid until the next append.
+    """
+
+    __slots__ = ("ts", "_columns")
+
+    def __init__(self, ts, columns):
+        self.ts = ts
+        self._columns = columns
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __len__(self):
+        return len(self.ts)
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def to_frame(self, tz=DEFAULT_TZ):
+        """Copies the window into a DataFrame shaped like CandleStore.read output."""
+        frame = pd.DataFrame({name: values.copy() for name, values in self._columns.items()})
+        frame.insert(0, "Datetime", pd.to_datetime(self.ts, utc=True).tz_convert(tz))
+        return frame
+
+
+class CandleRingBuffer:
+    """
+    Fixed-capacity buffer of the newest `capacity` candles in typed NumPy arrays:
+    int64 UTC epoch-nanosecond timestamps and float64 (or float32) OHLCV.
+
+    Every candle is written twice, at slot i and i + capacity, so the newest n
+    candles are always one contiguous slice and `window(n)` is a view, never a
+    copy. Appending never allocates; memory stays at 2 * capacity rows however
+    long the process runs. A candle with the same timestamp as the newest one
+    replaces it in place (it was still forming).
+    """
+
+    def __init__(self, capacity, dtype=np.float64):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._ts = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.zeros((len(PRICE_COLUMNS), 2 * capacity), dtype=dtype)
+        self._count = 0  # Candles ever appended
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    @property
+    def last_timestamp(self):
+        """Newest timestamp as UTC epoch nanoseconds, or None when empty."""
+        if self._count == 0:
+            return None
+        return int(self._ts[(self._count - 1) % self.capacity])
+
+    def _write(self, slot, ts, values):
+        self._ts[slot] = self._ts[slot + self.capacity] = ts
+        self._values[:, slot] = self._values[:, slot + self.capacity] = values
+
+    def append(self, ts, open_, high, low, close, volume):
+        """Appends one candle; returns False (and ignores it) if it is older than the newest one."""
+        last = self.last_timestamp
+        if last is not None and ts < last:
+            return False
+        if last is not None and ts == last:
+            self._write((self._count - 1) % self.capacity, ts, (open_, high, low, close, volume))
+        else:
+            self._write(self._count % self.capacity, ts, (open_, high, low, close, volume))
+            self._count += 1
+        return True
+
+    def extend(self, data):
+        """
+        Appends the candles of a fetched frame (Datetime/Date column or index plus
+        OHLCV) or CANDLE_DTYPE records that are not older than the newest candle.
+        Returns the number of candles added or updated.
+        """
+        records = data if isinstance(data, np.ndarray) else _to_records(data)
+        last = self.last_timestamp
+        if last is not None:
+            records = records[records["ts"] >= last]
+        count = len(records)
+        if count and records["ts"][0] == last:
+            self.append(int(records["ts"][0]), *(records[column][0] for column in PRICE_COLUMNS))
+            records = records[1:]
+        if len(records) and not (np.diff(records["ts"]) > 0).all():
+            # Unsorted or duplicated input: let append sort it out one candle at a time
+            for record in records:
+                self.append(int(record["ts"]), *(record[column] for column in PRICE_COLUMNS))
+            return count
+
+        # Only the newest `capacity` candles can survive; skip writing the rest
+        skipped = max(len(records) - self.capacity, 0)
+        records = records[skipped:]
+        slots = (self._count + skipped + np.arange(len(records))) % self.capacity
+        values = np.vstack([records[column] for column in PRICE_COLUMNS])
+        for offset in (0, self.capacity):
+            self._ts[slots + offset] = records["ts"]
+            self._values[:, slots + offset] = values
+        self._count += skipped + len(records)
+        return count
+
+    def window(self, n=None):
+        """Zero-copy view of the newest `n` candles (all of them by default)."""
+        n = len(self) if n is None else min(n, len(self))
+        end = (self._count - 1) % self.capacity + self.capacity + 1 if self._count else 0
+        start = end - n
+        ts = self._ts[start:end]
+        ts.flags.writeable = False
+        columns = {}
+        for index, name in enumerate(PRICE_COLUMNS):
+            view = self._values[index, start:end]
+            view.flags.writeable = False
+            columns[name] = view
+        return CandleWindow(ts, columns)
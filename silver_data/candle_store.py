@@ -0,0 +1,157 @@
+import os
+import re
+import logging
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+DEFAULT_TZ = "America/New_York"  # Exchange timezone yfinance reports for COMEX futures
+
+# One record per candle; timestamps are UTC epoch nanoseconds
+CANDLE_DTYPE = np.dtype([
+    ("ts", "<i8"),
+    ("Open", "<f8"),
+    ("High", "<f8"),
+    ("Low", "<f8"),
+    ("Close", "<f8"),
+    ("Volume", "<i8"),
+])
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class CandleStore:
+    """
+    Local on-disk OHLCV store, one memory-mappable .npy file per UTC day:
+
+        <root>/<symbol>/<interval>/<YYYY-MM-DD>.npy
+
+    Writes merge into the day partitions they touch, keeping the newest copy of
+    each timestamp, so re-writing overlapping candles is idempotent.
+    """
+
+    def __init__(self, root="candle_store"):
+        self.root = root
+        self._last = {}
+
+    def _series_dir(self, symbol, interval):
+        safe_symbol = re.sub(r"[^A-Za-z0-9_.-]", "_", symbol)
+        return os.path.join(self.root, safe_symbol, interval)
+
+    def _partitions(self, symbol, interval):
+        directory = self._series_dir(symbol, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if name.endswith(".npy"))
+
+    def last_timestamp(self, symbol, interval):
+        """Timestamp of the newest stored candle, or None if nothing is stored yet."""
+        key = (symbol, interval)
+        if key not in self._last:
+            partitions = self._partitions(symbol, interval)
+            if not partitions:
+                return None
+            path = os.path.join(self._series_dir(symbol, interval), partitions[-1])
+            records = np.load(path, mmap_mode="r")
+            self._last[key] = int(records["ts"][-1]) if len(records) else None
+        if self._last[key] is None:
+            return None
+        return pd.Timestamp(self._last[key], tz="UTC")
+
+    def write(self, symbol, interval, data):
+        """
+        Merges a fetched frame (Datetime/Date column or index plus OHLCV) into the store.
+        Returns the number of candles that were not stored before.
+        """
+        records = _to_records(data)
+        if len(records) == 0:
+            return 0
+
+        directory = self._series_dir(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+
+        days = records["ts"] // (86400 * 10**9)
+        added = 0
+        for day in np.unique(days):
+            chunk = records[days == day]
+            name = pd.Timestamp(int(day) * 86400, unit="s").strftime("%Y-%m-%d") + ".npy"
+            path = os.path.join(directory, name)
+
+            if os.path.exists(path):
+                existing = np.load(path)
+                added += len(np.setdiff1d(chunk["ts"], existing["ts"]))
+                chunk = np.concatenate([existing, chunk])
+            else:
+                added += len(np.unique(chunk["ts"]))
+
+            # Keep the last occurrence of each timestamp: newer fetches win
+            _, last_index = np.unique(chunk["ts"][::-1], return_index=True)
+            merged = chunk[::-1][last_index]
+
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as f:
+                np.save(f, merged)
+            os.replace(temp_path, path)
+
+        newest = int(records["ts"].max())
+        previous = self._last.get((symbol, interval))
+        self._last[(symbol, interval)] = newest if previous is None else max(previous, newest)
+
+        logging.info(f"Stored {added} new candles for {symbol} ({interval}).")
+        return added
+
+    def read(self, symbol, interval, start=None, end=None, tz=DEFAULT_TZ):
+        """
+        Returns stored candles in [start, end) as a DataFrame shaped like fetch_silver_data's output.
+        """
+        start_ns = _to_ns(start)
+        end_ns = _to_ns(end)
+        first_day = None if start_ns is None else pd.Timestamp(start_ns, tz="UTC").strftime("%Y-%m-%d")
+        last_day = None if end_ns is None else pd.Timestamp(end_ns, tz="UTC").strftime("%Y-%m-%d")
+
+        directory = self._series_dir(symbol, interval)
+        chunks = []
+        for name in self._partitions(symbol, interval):
+            day = name[:-4]
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            records = np.load(os.path.join(directory, name), mmap_mode="r")
+            mask = np.ones(len(records), dtype=bool)
+            if start_ns is not None:
+                mask &= records["ts"] >= start_ns
+            if end_ns is not None:
+                mask &= records["ts"] < end_ns
+            chunks.append(records[mask])
+
+        records = np.concatenate(chunks) if chunks else np.empty(0, dtype=CANDLE_DTYPE)
+        frame = pd.DataFrame({column: records[column] for column in PRICE_COLUMNS})
+        frame.insert(0, "Datetime", pd.to_datetime(records["ts"], utc=True).tz_convert(tz))
+        return frame
+
+
+def _to_ns(value):
+    if value is None:
+        return None
+    value = pd.Timestamp(value)
+    if value.tzinfo is None:
+        value = value.tz_localize(DEFAULT_TZ)
+    return value.value
+
+
+def _to_records(data):
+    for column in ("Datetime", "Date"):
+        if column in data.columns:
+            timestamps = pd.DatetimeIndex(data[column])
+            break
+    else:
+        timestamps = pd.DatetimeIndex(data.index)
+    if timestamps.tz is None:
+        timestamps = timestamps.tz_localize(DEFAULT_TZ)
+
+    records = np.empty(len(data), dtype=CANDLE_DTYPE)
+    records["ts"] = timestamps.tz_convert("UTC").tz_localize(None).values.astype("datetime64[ns]").astype("int64")
+    for column in PRICE_COLUMNS:
+        values = data[column]
+        records[column] = values.fillna(0).to_numpy() if column == "Volume" else values.to_numpy()
+    return records
@@ -0,0 +1,285 @@
+import copy
+import math
+import logging
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Same columns, in the same order, as calculate_indicators writes them
+INDICATOR_COLUMNS = [
+    "ema_50", "ema_200",
+    "macd_line", "macd_signal",
+    "rsi",
+    "stoch_k", "stoch_d",
+    "adx", "plus_di", "minus_di",
+    "upper_band", "lower_band",
+]
+
+EPSILON = np.finfo(float).eps
+NAN = float("nan")
+
+
+def _valid(value):
+    return value is not None and not math.isnan(value)
+
+
+class _Ema:
+    """pandas_ta ema: seeded with the SMA of the first `length` values, then adjust=False."""
+
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.seed = []
+        self.value = None
+
+    def update(self, x):
+        if not _valid(x):
+            return self.value if self.value is not None else NAN
+        if self.value is None:
+            self.seed.append(x)
+            if len(self.seed) < self.length:
+                return NAN
+            self.value = sum(self.seed) / self.length
+            self.seed = []
+            return self.value
+        self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+
+class _Rma:
+    """pandas_ta rma: ewm(alpha=1/length, min_periods=length) with pandas' default adjust=True."""
+
+    def __init__(self, length):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.numerator = 0.0
+        self.denominator = 0.0
+        self.count = 0
+
+    def update(self, x):
+        if not _valid(x):
+            # Missing values still age the existing weights (ignore_na=False)
+            if self.count:
+                self.numerator *= self.decay
+                self.denominator *= self.decay
+        else:
+            self.numerator = self.decay * self.numerator + x
+            self.denominator = self.decay * self.denominator + 1.0
+            self.count += 1
+        if self.count < self.length:
+            return NAN
+        return self.numerator / self.denominator
+
+
+class _Sma:
+    def __init__(self, length):
+        self.length = length
+        self.window = deque(maxlen=length)
+
+    def update(self, x):
+        self.window.append(x)
+        if len(self.window) < self.length:
+            return NAN
+        return sum(self.window) / self.length
+
+
+class _Macd:
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = _Ema(fast)
+        self.slow = _Ema(slow)
+        self.signal = _Ema(signal)
+
+    def update(self, close):
+        line = self.fast.update(close) - self.slow.update(close)
+        if not _valid(line):
+            return NAN, NAN
+        return line, self.signal.update(line)
+
+
+class _Rsi:
+    def __init__(self, length=14):
+        self.positive = _Rma(length)
+        self.negative = _Rma(length)
+        self.prev_close = None
+
+    def update(self, close):
+        change = NAN if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+        positive = self.positive.update(max(change, 0.0) if _valid(change) else NAN)
+        negative = self.negative.update(min(change, 0.0) if _valid(change) else NAN)
+        total = positive + abs(negative)
+        if not _valid(total) or total == 0:
+            return NAN
+        return 100.0 * positive / total
+
+
+class _Stoch:
+    def __init__(self, k=14, d=3, smooth_k=3):
+        self.highs = deque(maxlen=k)
+        self.lows = deque(maxlen=k)
+        self.smooth_k = _Sma(smooth_k)
+        self.smooth_d = _Sma(d)
+
+    def update(self, high, low, close):
+        self.highs.append(high)
+        self.lows.append(low)
+        if len(self.highs) < self.highs.maxlen:
+            return NAN, NAN
+        lowest_low = min(self.lows)
+        price_range = max(self.highs) - lowest_low
+        stoch = 100.0 * (close - lowest_low) / (price_range or EPSILON)
+        stoch_k = self.smooth_k.update(stoch)
+        if not _valid(stoch_k):
+            return NAN, NAN
+        return stoch_k, self.smooth_d.update(stoch_k)
+
+
+class _Adx:
+    def __init__(self, length=14, lensig=14):
+        self.atr = _Rma(length)
+        self.positive = _Rma(length)
+        self.negative = _Rma(length)
+        self.adx = _Rma(lensig)
+        self.prev = None
+
+    def update(self, high, low, close):
+        if self.prev is None:
+            self.prev = (high, low, close)
+            return NAN, NAN, NAN
+        prev_high, prev_low, prev_close = self.prev
+        self.prev = (high, low, close)
+
+        true_range = max(high - low, abs(high - prev_close), abs(prev_close - low))
+        up = high - prev_high
+        down = prev_low - low
+        positive = up if up > down and up > 0 and abs(up) >= EPSILON else 0.0
+        negative = down if down > up and down > 0 and abs(down) >= EPSILON else 0.0
+
+        atr = self.atr.update(true_range)
+        positive = self.positive.update(positive)
+        negative = self.negative.update(negative)
+        if not _valid(atr) or atr == 0:
+            return NAN, NAN, NAN
+
+        plus_di = 100.0 * positive / atr
+        minus_di = 100.0 * negative / atr
+        total = plus_di + minus_di
+        dx = 100.0 * abs(plus_di - minus_di) / total if total else NAN
+        return self.adx.update(dx), plus_di, minus_di
+
+
+class _Bbands:
+    def __init__(self, length=20, std=2.0):
+        self.window = deque(maxlen=length)
+        self.std = std
+
+    def update(self, close):
+        self.window.append(close)
+        length = self.window.maxlen
+        if len(self.window) < length:
+            return NAN, NAN
+        mean = sum(self.window) / length
+        deviation = math.sqrt(sum((x - mean) ** 2 for x in self.window) / length)
+        return mean + self.std * deviation, mean - self.std * deviation
+
+
+class _EngineState:
+    def __init__(self):
+        self.ema_50 = _Ema(50)
+        self.ema_200 = _Ema(200)
+        self.macd = _Macd()
+        self.rsi = _Rsi()
+        self.stoch = _Stoch()
+        self.adx = _Adx()
+        self.bbands = _Bbands()
+
+    def update(self, high, low, close):
+        """Returns the indicator values for one candle, in INDICATOR_COLUMNS order."""
+        macd_line, macd_signal = self.macd.update(close)
+        stoch_k, stoch_d = self.stoch.update(high, low, close)
+        adx, plus_di, minus_di = self.adx.update(high, low, close)
+        upper_band, lower_band = self.bbands.update(close)
+        return (
+            self.ema_50.update(close), self.ema_200.update(close),
+            macd_line, macd_signal,
+            self.rsi.update(close),
+            stoch_k, stoch_d,
+            adx, plus_di, minus_di,
+            upper_band, lower_band,
+        )
+
+
+def _timestamps(data):
+    """Candle timestamps of a fetched frame: the Datetime (15m) or Date (1d) column, else the index."""
+    for column in ("Datetime", "Date"):
+        if column in data.columns:
+            return pd.Index(data[column])
+    return data.index
+
+
+class IndicatorEngine:
+    """
+    Stateful replacement for the full-frame pandas_ta recompute in calculate_indicators.
+
+    Every closed candle is folded into the running state once, in O(1), and its
+    indicator values are kept in a bounded history so older rows of the next
+    fetched frame can be filled without recomputing them. The newest candle of
+    a frame may still be forming, so it is evaluated on a throw-away copy of the
+    state and only committed once a later candle arrives.
+    """
+
+    def __init__(self, max_history=10000):
+        self.max_history = max_history
+        self.reset()
+
+    def reset(self):
+        self._state = _EngineState()
+        self.last_timestamp = None
+        self.history = pd.DataFrame(columns=INDICATOR_COLUMNS, dtype=float)
+
+    def update(self, high, low, close):
+        """Commits one closed candle and returns its indicator values as a dict."""
+        return dict(zip(INDICATOR_COLUMNS, self._state.update(high, low, close)))
+
+    def update_frame(self, data):
+        """
+        Returns a DataFrame of indicator columns aligned row-for-row with `data`,
+        computing only the candles newer than the last committed one.
+        """
+        timestamps = _timestamps(data)
+        if len(data) == 0:
+            return pd.DataFrame(columns=INDICATOR_COLUMNS, index=timestamps, dtype=float)
+
+        if self.last_timestamp is not None and timestamps[0] > self.last_timestamp:
+            logging.warning("Indicator state is older than the fetched frame. Rebuilding from scratch.")
+            self.reset()
+
+        if self.last_timestamp is None:
+            new_rows = np.arange(len(data))
+        else:
+            new_rows = np.flatnonzero(timestamps > self.last_timestamp)
+
+        highs = data["High"].to_numpy(dtype=float)
+        lows = data["Low"].to_numpy(dtype=float)
+        closes = data["Close"].to_numpy(dtype=float)
+
+        # Everything but the newest row is closed and can be committed
+        closed_rows = new_rows[new_rows < len(data) - 1]
+        if len(closed_rows):
+            values = [self._state.update(highs[i], lows[i], closes[i]) for i in closed_rows]
+            committed = pd.DataFrame(values, columns=INDICATOR_COLUMNS, index=timestamps[closed_rows])
+            self.history = pd.concat([self.history, committed]) if len(self.history) else committed
+            self.history = self.history.iloc[-self.max_history:]
+            self.last_timestamp = timestamps[closed_rows[-1]]
+
+        result = self.history.reindex(timestamps)
+        last = len(data) - 1
+        if self.last_timestamp is None or timestamps[last] > self.last_timestamp:
+            provisional = copy.deepcopy(self._state)
+            result.iloc[last] = provisional.update(highs[last], lows[last], closes[last])
+
+        logging.info(f"Updated indicators for {len(new_rows)} new candles.")
+        return result
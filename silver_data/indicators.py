@@ -1,9 +1,17 @@
 import pandas_ta as ta
 import logging
 
+from silver_data.indicator_engine import INDICATOR_COLUMNS
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-def calculate_indicators(data):
+def calculate_indicators(data, engine=None):
+    """
+    Adds EMA, MACD, RSI, Stochastic, ADX/DI and Bollinger band columns to `data`.
+
+    When an IndicatorEngine is passed, only candles newer than its saved state are
+    computed; the full pandas_ta recompute is used otherwise.
+    """
     required_cols = {"Close", "High", "Low"}
     
     # Ensure required columns exist
@@ -11,7 +19,10 @@ def calculate_indicators(data):
         missing_cols = required_cols - set(data.columns)
         logging.error(f"Missing columns: {missing_cols}. Cannot calculate indicators.")
         return data
-    
+
+    if engine is not None:
+        return _update_indicators(data, engine)
+
     try:
         data['ema_50'] = ta.ema(data['Close'], length=50)
         data['ema_200'] = ta.ema(data['Close'], length=200)
@@ -40,7 +51,7 @@ def calculate_indicators(data):
             data['lower_band'] = bollinger['BBL_20_2.0']
 
         # Fill NaN values (optional)
-        data.fillna(method='bfill', inplace=True)
+        data.bfill(inplace=True)
 
         logging.info("Indicators calculated successfully.")
 
@@ -48,3 +59,20 @@ def calculate_indicators(data):
         logging.error(f"Error calculating indicators: {e}")
 
     return data
+
+
+def _update_indicators(data, engine):
+    try:
+        indicators = engine.update_frame(data)
+        for column in INDICATOR_COLUMNS:
+            data[column] = indicators[column].to_numpy()
+
+        # Fill the warm-up rows the same way as the full recompute
+        data.bfill(inplace=True)
+
+        logging.info("Indicators updated incrementally.")
+
+    except Exception as e:
+        logging.error(f"Error updating indicators: {e}")
+
+    return data
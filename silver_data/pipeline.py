@@ -0,0 +1,228 @@
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from silver_data.silver_data import fetch_silver_data
+from silver_data.indicators import calculate_indicators
+from silver_data.Indicator_signal import generate_signals
+from silver_data.signal_rules import DEFAULT_RULES, rule_columns
+from silver_data.indicator_engine import IndicatorEngine
+from silver_data.trend import identify_trend_signals, TREND_WINDOW
+from silver_data.candle_buffer import CandleRingBuffer
+from silver_data.resample import TIMEFRAME_NS, TimeframeResampler
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Metals futures on Yahoo Finance
+DEFAULT_SYMBOLS = ["SI=F", "GC=F", "HG=F", "PL=F"]  # Silver, gold, copper, platinum
+DEFAULT_INTERVALS = ["15m"]
+# Derived from each symbol's 15m candles instead of fetched
+SOURCE_INTERVAL = "15m"
+DEFAULT_TIMEFRAMES = ["1h", "4h", "1d"]
+PRIMARY_MARKET = ("SI=F", "15m")  # Feeds the sheet and the WhatsApp broadcast
+BUFFER_CAPACITY = 60 * 96  # 60 days of 15m candles, the longest yfinance intraday history
+MIN_DERIVED_BARS = 250  # ema_200, the longest indicator lookback, plus room for it to settle
+SIGNAL_LABELS = {1: "BUY", -1: "SELL", 0: "HOLD"}
+SIGNAL_COLUMNS = rule_columns({"default": DEFAULT_RULES})
+
+
+def market_key(symbol, interval):
+    return f"{symbol}:{interval}"
+
+
+def configured_markets():
+    """(symbol, interval) pairs from PIPELINE_SYMBOLS / PIPELINE_INTERVALS (comma separated)."""
+    symbols = os.getenv("PIPELINE_SYMBOLS")
+    intervals = os.getenv("PIPELINE_INTERVALS")
+    symbols = [s.strip() for s in symbols.split(",") if s.strip()] if symbols else DEFAULT_SYMBOLS
+    intervals = [i.strip() for i in intervals.split(",") if i.strip()] if intervals else DEFAULT_INTERVALS
+    markets = [(symbol, interval) for symbol in symbols for interval in intervals]
+    if PRIMARY_MARKET not in markets:
+        markets.insert(0, PRIMARY_MARKET)
+    return markets
+
+
+def configured_timeframes():
+    """Timeframes to derive from SOURCE_INTERVAL candles, from PIPELINE_TIMEFRAMES (comma separated)."""
+    timeframes = os.getenv("PIPELINE_TIMEFRAMES")
+    if timeframes is None:
+        return list(DEFAULT_TIMEFRAMES)
+    timeframes = [t.strip() for t in timeframes.split(",") if t.strip()]
+    unknown = [t for t in timeframes if t not in TIMEFRAME_NS]
+    if unknown:
+        logging.warning(f"Ignoring unsupported timeframes {unknown}; expected some of {list(TIMEFRAME_NS)}")
+    return [t for t in timeframes if t in TIMEFRAME_NS]
+
+
+def _json_value(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        # NaN and infinity (e.g. ATR on too few candles) are not valid JSON
+        return float(value) if np.isfinite(value) else None
+    return value
+
+
+def to_json_safe(result):
+    """Converts numpy scalars to Python types and non-finite floats to None, for JSON compatibility."""
+    return {key: _json_value(value) for key, value in result.items()}
+
+
+def latest_signal(data):
+    """
+    generate_signals' verdict on the newest candle ("BUY", "SELL" or "HOLD"), or None
+    when an indicator the rules need is still NaN there (too little history, e.g.
+    ema_200 on a young 1d series), since every rule would then read as HOLD.
+    Runs on a shallow copy so `data` does not gain its columns on the way to the sheet.
+    """
+    if data.empty or data[[c for c in SIGNAL_COLUMNS if c in data.columns]].iloc[-1].isna().any():
+        return None
+    signals = generate_signals(data.copy(deep=False))
+    if signals.empty or "signal" not in signals.columns:
+        return None
+    return SIGNAL_LABELS.get(int(signals["signal"].iloc[-1]))
+
+
+def analyze_market(data, engine=None, trend=True):
+    """
+    Runs one market's frame through calculate_indicators and generate_signals and,
+    unless `trend` is False, identify_trend_signals. The summary holds the newest
+    candle's "signal" and the trend keys.
+
+    `engine` is updated in place (and returned), so passing the same one on the
+    next run keeps the computation incremental. Stage durations are recorded in
+    `data.attrs["stage_seconds"]`.
+    """
+    engine = engine if engine is not None else IndicatorEngine()
+    start = time.perf_counter()
+    data = calculate_indicators(data, engine=engine)
+    indicators_done = time.perf_counter()
+    summary = {"signal": latest_signal(data)}
+    signals_done = time.perf_counter()
+    data.attrs["stage_seconds"] = {"indicators": indicators_done - start, "signals": signals_done - indicators_done}
+    if trend:
+        summary.update(to_json_safe(identify_trend_signals(data)))
+        data.attrs["stage_seconds"]["trend"] = time.perf_counter() - signals_done
+    return summary, data, engine
+
+
+class MarketPipeline:
+    """
+    Fetches every configured (symbol, interval) and analyzes them in this process.
+
+    Each market keeps its IndicatorEngine resident between runs, so a run only
+    folds in the candles that arrived since the last one; shipping the frames
+    and engines to worker processes would cost far more than that update.
+
+    Each market's candles are also kept in a CandleRingBuffer of `buffer_capacity`
+    candles that fetched frames are appended to in place; the trend summary is
+    computed in this process from a view of its newest candles.
+
+    For every symbol fetched at SOURCE_INTERVAL, the `timeframes` bars (1h, 4h and
+    1d by default) are resampled incrementally from that buffer and analyzed as
+    markets of their own, without another download. A timeframe that is also
+    fetched directly is not derived.
+    """
+
+    def __init__(self, markets=None, store=None, buffer_capacity=BUFFER_CAPACITY, timeframes=None):
+        self.markets = markets or configured_markets()
+        self.store = store
+        self.buffer_capacity = buffer_capacity
+        self.timeframes = configured_timeframes() if timeframes is None else timeframes
+        self.engines = {}
+        self.buffers = {}
+        self.resamplers = {}
+
+    def fetch(self):
+        """Downloads all markets concurrently; network-bound, so threads are enough."""
+        with ThreadPoolExecutor(max_workers=min(8, len(self.markets))) as pool:
+            futures = {
+                (symbol, interval): pool.submit(fetch_silver_data, self.store, symbol, interval)
+                for symbol, interval in self.markets
+            }
+        frames = {}
+        for market, future in futures.items():
+            try:
+                frames[market] = future.result()
+            except Exception as e:
+                logging.error(f"Failed to fetch {market_key(*market)}: {e}")
+                frames[market] = None
+        return frames
+
+    def buffer(self, market):
+        """The market's candle buffer, created empty on first use."""
+        buffer = self.buffers.get(market)
+        if buffer is None:
+            buffer = self.buffers[market] = CandleRingBuffer(self.buffer_capacity)
+        return buffer
+
+    def resampler(self, market):
+        """
+        The derived market's resampler, whose buffer also becomes the market's buffer.
+
+        It holds at least MIN_DERIVED_BARS bars, more than the 15m buffer alone spans
+        for 4h and 1d, and is seeded with every stored 15m candle those bars cover.
+        """
+        resampler = self.resamplers.get(market)
+        if resampler is None:
+            symbol, timeframe = market
+            capacity = max(self.buffer_capacity * TIMEFRAME_NS[SOURCE_INTERVAL] // TIMEFRAME_NS[timeframe] + 1,
+                           MIN_DERIVED_BARS)
+            resampler = self.resamplers[market] = TimeframeResampler(timeframe, capacity)
+            self.buffers[market] = resampler.buffer
+            if self.store is not None:
+                start = pd.Timestamp.now(tz="UTC") - pd.Timedelta(TIMEFRAME_NS[timeframe] * capacity, unit="ns")
+                history = self.store.read(symbol, SOURCE_INTERVAL, start=start)
+                if not history.empty:
+                    seed = CandleRingBuffer(len(history))
+                    seed.extend(history)
+                    resampler.update(seed)
+        return resampler
+
+    def analyze(self, frames):
+        """
+        Returns {market: (summary, frame)} for the fetched and the derived markets;
+        summary is an {"error": ...} dict for markets that failed.
+        """
+        results = {}
+        for market, data in frames.items():
+            if data is None or data.empty:
+                results[market] = ({"error": "No data fetched"}, None)
+                continue
+            # Only candles newer than the buffer's newest one are written
+            buffer = self.buffer(market)
+            buffer.extend(data)
+            results[market] = self._analyze_market(market, data)
+
+            symbol, interval = market
+            if interval != SOURCE_INTERVAL:
+                continue
+            for timeframe in self.timeframes:
+                derived = (symbol, timeframe)
+                if derived in frames:
+                    continue
+                resampler = self.resampler(derived)
+                resampler.update(buffer)
+                results[derived] = self._analyze_market(derived, resampler.window().to_frame())
+        return results
+
+    def _analyze_market(self, market, data):
+        try:
+            engine = self.engines.setdefault(market, IndicatorEngine())
+            signal, data, _ = analyze_market(data, engine, trend=False)
+            start = time.perf_counter()
+            summary = to_json_safe(identify_trend_signals(self.buffers[market].window(TREND_WINDOW)))
+            summary.update(signal)
+            data.attrs["stage_seconds"]["trend"] = time.perf_counter() - start
+            return summary, data
+        except Exception as e:
+            logging.error(f"Failed to analyze {market_key(*market)}: {e}")
+            self.engines.pop(market, None)  # Rebuild from scratch next run
+            return {"error": str(e)}, None
+
+    def run(self):
+        return self.analyze(self.fetch())
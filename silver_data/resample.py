@@ -0,0 +1,81 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from silver_data.candle_buffer import CandleRingBuffer
+from silver_data.candle_store import CANDLE_DTYPE, DEFAULT_TZ
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+MINUTE_NS = 60 * 1_000_000_000
+TIMEFRAME_NS = {
+    "15m": 15 * MINUTE_NS,
+    "30m": 30 * MINUTE_NS,
+    "1h": 60 * MINUTE_NS,
+    "4h": 4 * 60 * MINUTE_NS,
+    "1d": 24 * 60 * MINUTE_NS,
+}
+
+
+def bucket_keys(ts, timeframe, tz=DEFAULT_TZ):
+    """
+    Bucket number of each UTC epoch-ns timestamp, and the UTC start of that bucket.
+
+    Buckets of up to an hour are aligned in UTC. Longer ones follow the wall clock
+    of `tz`: 4h buckets start at local 00:00, 04:00, ... every day (DataFrame.resample
+    drifts by an hour after a DST change) and 1d buckets are calendar days, so a DST
+    day has 23 or 25 hours.
+    """
+    width = TIMEFRAME_NS[timeframe]
+    if width <= TIMEFRAME_NS["1h"]:
+        return ts // width, ts - ts % width
+    wall = pd.to_datetime(ts, utc=True).tz_convert(tz).tz_localize(None).asi8
+    offset = wall - ts
+    return wall // width, wall - wall % width - offset
+
+
+class TimeframeResampler:
+    """
+    `timeframe` bars derived from a CandleRingBuffer of finer candles (15m) and
+    kept in a CandleRingBuffer of their own.
+
+    Closed bars are written once. Each update re-aggregates only the bucket that
+    was still open, plus any started since, from a view of the source buffer, so a
+    forming 15m candle that is replaced in place also updates its bar.
+    """
+
+    def __init__(self, timeframe, capacity, tz=DEFAULT_TZ):
+        if timeframe not in TIMEFRAME_NS:
+            raise ValueError(f"Unsupported timeframe {timeframe!r}; expected one of {', '.join(TIMEFRAME_NS)}")
+        self.timeframe = timeframe
+        self.tz = tz
+        self.buffer = CandleRingBuffer(capacity)
+        self._open_start = None  # Timestamp of the first source candle in the open bucket
+
+    def update(self, source):
+        """Folds new and updated candles of `source` into the bars. Returns the number of bars written."""
+        window = source.window()
+        first = 0 if self._open_start is None else int(np.searchsorted(window.ts, self._open_start))
+        ts = window.ts[first:]
+        if len(ts) == 0:
+            return 0
+
+        keys, starts_at = bucket_keys(ts, self.timeframe, self.tz)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+        ends = np.append(starts[1:], len(ts))
+
+        # NaN-skipping aggregation, like resample().agg on a frame
+        bars = np.empty(len(starts), dtype=CANDLE_DTYPE)
+        bars["ts"] = starts_at[starts]
+        bars["Open"] = window["Open"][first:][starts]
+        bars["High"] = np.fmax.reduceat(window["High"][first:], starts)
+        bars["Low"] = np.fmin.reduceat(window["Low"][first:], starts)
+        bars["Close"] = window["Close"][first:][ends - 1]
+        bars["Volume"] = np.add.reduceat(np.nan_to_num(window["Volume"][first:]), starts)
+
+        self._open_start = int(ts[starts[-1]])
+        return self.buffer.extend(bars)
+
+    def window(self, n=None):
+        return self.buffer.window(n)
@@ -0,0 +1,154 @@
+import os
+import json
+import logging
+
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class SheetSyncState:
+    """
+    High-water mark of what has been written to the sheet, persisted as JSON:
+    the newest Datetime, the number of used rows (header included) and the
+    position of the Datetime column. `appended_rows` counts the rows written by
+    the latest sync and is not persisted.
+    """
+
+    def __init__(self, path="sheet_sync_state.json"):
+        self.path = path
+        self.last_datetime = None
+        self.row_count = 0
+        self.datetime_column = 0
+        self.appended_rows = 0
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            self.last_datetime = pd.Timestamp(state["last_datetime"]) if state.get("last_datetime") else None
+            self.row_count = int(state.get("row_count", 0))
+            self.datetime_column = int(state.get("datetime_column", 0))
+        except (ValueError, KeyError, OSError) as e:
+            logging.warning(f"Ignoring unreadable sheet sync state {self.path}: {e}")
+            self.clear()
+
+    def save(self):
+        state = {
+            "last_datetime": self.last_datetime.isoformat() if self.last_datetime is not None else None,
+            "row_count": self.row_count,
+            "datetime_column": self.datetime_column,
+        }
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        self.last_datetime = None
+        self.row_count = 0
+        self.datetime_column = 0
+
+    @property
+    def is_empty(self):
+        return self.last_datetime is None or self.row_count < 2
+
+
+def _parse_datetime(value):
+    timestamp = pd.to_datetime(value, errors="coerce")
+    if pd.isna(timestamp):
+        return None
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("America/New_York")
+    return timestamp
+
+
+def _rebuild_state(worksheet, state):
+    """Full read of the sheet, only needed the first time or when the sheet was edited externally."""
+    logging.info("Rebuilding sheet sync state from a full read of the sheet...")
+    state.clear()
+    values = worksheet.get_all_values()
+    if len(values) < 2 or "Datetime" not in values[0]:
+        return
+
+    state.datetime_column = values[0].index("Datetime")
+    datetimes = pd.to_datetime([row[state.datetime_column] for row in values[1:]], errors="coerce", utc=True)
+    if datetimes.isna().all():
+        return
+    state.row_count = len(values)
+    state.last_datetime = datetimes.max().tz_convert("America/New_York")
+
+
+def _validate_state(worksheet, state):
+    """Reads only the last tracked row and checks it still holds the high-water mark."""
+    if state.is_empty:
+        return False
+    row = worksheet.row_values(state.row_count)
+    if len(row) <= state.datetime_column:
+        return False
+    return _parse_datetime(row[state.datetime_column]) == state.last_datetime
+
+
+def sync_new_data(worksheet, new_data, state, max_rows=None):
+    """
+    Appends only candles newer than the persisted high-water mark and trims the
+    oldest rows down to `max_rows` data rows, in a single batchUpdate request.
+    """
+    state.appended_rows = 0
+    new_data = new_data.copy()
+    new_data["Datetime"] = pd.to_datetime(new_data["Datetime"], errors="coerce")
+    if new_data["Datetime"].dt.tz is None:
+        new_data["Datetime"] = new_data["Datetime"].dt.tz_localize("America/New_York")
+
+    if not _validate_state(worksheet, state):
+        _rebuild_state(worksheet, state)
+
+    if state.is_empty:
+        if max_rows:
+            new_data = new_data.iloc[-max_rows:]
+        logging.info("Sheet is empty. Writing full dataset with headers...")
+        worksheet.update([new_data.columns.tolist()] + new_data.astype(str).values.tolist())
+        state.row_count = len(new_data) + 1
+        state.datetime_column = new_data.columns.get_loc("Datetime")
+        state.last_datetime = new_data["Datetime"].max()
+        state.appended_rows = len(new_data)
+        state.save()
+        logging.info(f"Stored {len(new_data)} rows in the empty sheet.")
+        return True
+
+    new_data = new_data[new_data["Datetime"] > state.last_datetime]
+    if new_data.empty:
+        logging.info("No new data to append.")
+        return True
+
+    rows = new_data.astype(str).values.tolist()
+    requests = [{
+        "appendCells": {
+            "sheetId": worksheet.id,
+            "rows": [{"values": [{"userEnteredValue": {"stringValue": value}} for value in row]} for row in rows],
+            "fields": "userEnteredValue",
+        }
+    }]
+
+    row_count = state.row_count + len(rows)
+    excess = row_count - 1 - max_rows if max_rows else 0
+    if excess > 0:
+        # Row 0 is the header; delete the oldest data rows right below it
+        requests.append({
+            "deleteDimension": {
+                "range": {"sheetId": worksheet.id, "dimension": "ROWS", "startIndex": 1, "endIndex": 1 + excess}
+            }
+        })
+        row_count -= excess
+
+    worksheet.spreadsheet.batch_update({"requests": requests})
+    logging.info(f"Appended {len(rows)} new rows and trimmed {max(excess, 0)} old rows in one request.")
+
+    state.row_count = row_count
+    state.last_datetime = new_data["Datetime"].max()
+    state.appended_rows = len(rows)
+    state.save()
+    return True
@@ -0,0 +1,174 @@
+import logging
+import operator
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+TREND_WINDOW = 48  # Candles compared by price_trend
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# A rule set is a list of conditions for buy and for sell; every condition must hold.
+# A condition is a (column, operator, column-or-number) tuple, or AnyOf(...) of conditions.
+RuleSet = namedtuple("RuleSet", ["buy", "sell"])
+
+
+class AnyOf(tuple):
+    """Condition that holds when at least one of its conditions holds."""
+
+    def __new__(cls, *conditions):
+        return super().__new__(cls, conditions)
+
+
+def _price_trend(columns):
+    # Same as rolling(48).apply(last > first): compare each close with the one 47 candles back
+    close = columns("Close")
+    lag = TREND_WINDOW - 1
+    trend = np.full(len(close), np.nan)
+    if len(close) > lag:
+        trend[lag:] = np.where(close[lag:] > close[:-lag], 1.0, -1.0)
+        trend[lag:][np.isnan(close[lag:]) | np.isnan(close[:-lag])] = np.nan
+    return trend
+
+
+def _pct_change(column, periods):
+    def feature(columns):
+        values = columns(column)
+        change = np.full(len(values), np.nan)
+        if len(values) > periods:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                change[periods:] = values[periods:] / values[:-periods] - 1
+        return change
+    return feature
+
+
+# Derived columns that rules can reference like any column of the frame
+FEATURES = {
+    "price_trend": _price_trend,
+    "plus_di_pct_5": _pct_change("plus_di", 5),
+    "minus_di_pct_5": _pct_change("minus_di", 5),
+}
+
+DEFAULT_RULES = RuleSet(
+    buy=[
+        ("price_trend", "==", 1),  # Upward trend in the last 48 candles
+        ("Close", ">", "ema_50"),  # Price above 50 EMA
+        ("Close", ">", "ema_200"),  # Price above 200 EMA
+        ("macd_line", ">", "macd_signal"),  # MACD line above signal line
+        ("macd_line", ">", 0),  # MACD line above zero
+        ("rsi", ">", 50),  # RSI above 50
+        ("stoch_k", ">", 60),  # Stochastic %K above 60
+        ("stoch_d", ">", 50),  # Stochastic %D above 50
+        ("adx", ">", 15),  # ADX above 15 (trend strength)
+        AnyOf(("plus_di", ">", "minus_di"), ("plus_di_pct_5", ">", 0.1)),  # +DI > -DI or recent increase
+    ],
+    sell=[
+        ("price_trend", "==", -1),  # Downward trend in the last 48 candles
+        ("Close", "<", "ema_50"),  # Price below 50 EMA
+        ("Close", "<", "ema_200"),  # Price below 200 EMA
+        ("macd_line", "<", "macd_signal"),  # MACD line below signal line
+        ("macd_line", "<", 0),  # MACD line below zero
+        ("rsi", "<", 55),  # RSI below 55
+        AnyOf(("stoch_k", "<", 50), ("stoch_d", "<", 60)),  # %K below 50 or %D below 60
+        ("adx", ">", 15),  # ADX above 15 (trend strength)
+        AnyOf(("minus_di", ">", "plus_di"), ("minus_di_pct_5", ">", 0.1)),  # -DI > +DI or recent increase
+    ],
+)
+
+
+def rule_columns(rule_sets):
+    """Names of every column or feature referenced by the given rule sets."""
+    names = set()
+
+    def visit(condition):
+        if isinstance(condition, AnyOf):
+            for inner in condition:
+                visit(inner)
+            return
+        left, _, right = condition
+        names.add(left)
+        if isinstance(right, str):
+            names.add(right)
+
+    for rules in rule_sets.values():
+        for condition in list(rules.buy) + list(rules.sell):
+            visit(condition)
+    return names
+
+
+class RuleEvaluator:
+    """
+    Compiles conditions into NumPy boolean masks over one frame.
+
+    Columns, derived features and individual conditions are evaluated once and
+    cached, so rule sets that share conditions share the work.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._columns = {}
+        self._masks = {}
+
+    def column(self, name):
+        if name not in self._columns:
+            if name in FEATURES:
+                self._columns[name] = FEATURES[name](self.column)
+            else:
+                self._columns[name] = self.data[name].to_numpy(dtype=float)
+        return self._columns[name]
+
+    def mask(self, condition):
+        if condition in self._masks:
+            return self._masks[condition]
+
+        if isinstance(condition, AnyOf):
+            result = np.zeros(len(self.data), dtype=bool)
+            for inner in condition:
+                result |= self.mask(inner)
+        else:
+            left, op, right = condition
+            right = self.column(right) if isinstance(right, str) else right
+            result = OPERATORS[op](self.column(left), right)
+
+        self._masks[condition] = result
+        return result
+
+    def all_of(self, conditions):
+        result = np.ones(len(self.data), dtype=bool)
+        for condition in conditions:
+            result &= self.mask(condition)
+        return result
+
+    def signals(self, rules):
+        """Returns 1 (Buy), -1 (Sell) or 0 (Hold) per row; sell wins if both match."""
+        buy = self.all_of(rules.buy)
+        sell = self.all_of(rules.sell)
+        return np.where(sell, -1, np.where(buy, 1, 0))
+
+
+def evaluate_rule_sets(data, rule_sets):
+    """
+    Evaluates several named rule sets over the same frame in one pass.
+
+    Returns a DataFrame with one signal column per rule set name, aligned with `data`.
+    """
+    missing = rule_columns(rule_sets) - set(FEATURES) - set(data.columns)
+    if missing:
+        logging.error(f"Missing columns for rule evaluation: {missing}")
+        return None
+
+    evaluator = RuleEvaluator(data)
+    return pd.DataFrame(
+        {name: evaluator.signals(rules) for name, rules in rule_sets.items()},
+        index=data.index,
+    )
@@ -1,53 +1,90 @@
-import yfinance as yf
 import pandas as pd
 import json
 import os
 import logging
+import threading
 from datetime import datetime, timedelta
-import gspread
+from functools import lru_cache
 from dotenv import load_dotenv
-from google.oauth2.service_account import Credentials
 
-google_creds = json.loads(os.getenv("GOOGLE_CREDENTIALS"))
+from silver_data.sheet_sync import sync_new_data
+
+# Load environment variables from .env file
+load_dotenv()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-import yfinance as yf
-import pandas as pd
-import json
-import os
-import logging
-from datetime import datetime, timedelta
-import gspread
-from dotenv import load_dotenv
-from google.oauth2.service_account import Credentials
+# yfinance, gspread and google-auth are imported inside the functions that use them,
+# so importing this module (e.g. only for append_new_data) stays cheap.
 
-# Load environment variables from .env file
-load_dotenv()
+@lru_cache(maxsize=None)
+def load_google_credentials():
+    """
+    Load Google credentials from the GOOGLE_CREDENTIALS environment variable, on first use.
+    """
+    raw = os.getenv("GOOGLE_CREDENTIALS")
+    if not raw:
+        raise RuntimeError("GOOGLE_CREDENTIALS is not set; it must hold the service account JSON.")
+    return json.loads(raw)
 
-# Load Google credentials from environment variable
-google_creds = json.loads(os.getenv("GOOGLE_CREDENTIALS"))
+SHEETS_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+# One client per process: its AuthorizedSession keeps the HTTP connection open and
+# reuses the access token, refreshing it only when it has expired
+_sheets_client = None
+_spreadsheets = {}  # sheet_id -> Spreadsheet
+_worksheets = {}  # (sheet_id, worksheet title or id) -> Worksheet
+_sheets_lock = threading.Lock()
 
-def authenticate_google_sheets(sheet_id):
+def get_sheets_client():
     """
-    Authenticate with Google Sheets using credentials from environment variables.
+    Process-wide gspread client built from the in-memory service account info.
     """
-    try:
-        # Write the credentials to a temporary file
-        with open("temp_credentials.json", "w") as f:
-            json.dump(google_creds, f)
+    global _sheets_client
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    with _sheets_lock:
+        if _sheets_client is None:
+            creds = Credentials.from_service_account_info(load_google_credentials(), scopes=SHEETS_SCOPES)
+            _sheets_client = gspread.authorize(creds)
+        return _sheets_client
+
+def reset_google_sheets(client=False):
+    """
+    Forgets cached spreadsheet and worksheet handles (and the client too if `client`),
+    e.g. after an error in case a worksheet was renamed or recreated.
+    """
+    global _sheets_client
+    with _sheets_lock:
+        _spreadsheets.clear()
+        _worksheets.clear()
+        if client:
+            _sheets_client = None
+
+def authenticate_google_sheets(sheet_id, worksheet="Sheet2"):
+    """
+    Returns the worksheet (by title, or by numeric id) of the given spreadsheet.
+    Handles are cached, so after the first call this makes no API requests.
+    """
+    key = (sheet_id, worksheet)
+    cached = _worksheets.get(key)
+    if cached is not None:
+        return cached
 
-        # Authenticate with Google Sheets
-        scope = ["https://www.googleapis.com/auth/spreadsheets"]
-        creds = Credentials.from_service_account_file("temp_credentials.json", scopes=scope)
-        client = gspread.authorize(creds)
+    try:
+        client = get_sheets_client()
+        spreadsheet = _spreadsheets.get(sheet_id)
+        if spreadsheet is None:
+            spreadsheet = _spreadsheets[sheet_id] = client.open_by_key(sheet_id)
 
         # Access Sheet2 instead of Sheet1
-        sheet = client.open_by_key(sheet_id).worksheet("Sheet2")
+        if isinstance(worksheet, int):
+            sheet = spreadsheet.get_worksheet_by_id(worksheet)
+        else:
+            sheet = spreadsheet.worksheet(worksheet)
+        _worksheets[key] = sheet
         return sheet
     except Exception as e:
         logging.error(f"Failed to authenticate with Google Sheets: {e}")
@@ -55,21 +92,32 @@ def authenticate_google_sheets(sheet_id):
 
 
 
-def fetch_silver_data():
+def fetch_silver_data(store=None, ticker_symbol="SI=F", interval="15m"):
+    """
+    Fetches the last 60 days of candles, 15m silver futures by default.
+
+    With a CandleStore, only candles from the last stored one onwards are downloaded
+    and merged into the store, and the 60-day window is read back from disk.
+    """
+    import yfinance as yf
+
     today = datetime.now()
     sixty_days_ago = today - timedelta(days=60)
 
-    logging.info(f"Fetching data from {sixty_days_ago.strftime('%Y-%m-%d')} to {today.strftime('%Y-%m-%d')}...")
-
-    ticker_symbol = "SI=F"  # Silver futures on Yahoo Finance
     data = yf.Ticker(ticker_symbol)
 
-    # Try fetching 15m data first
-    silver = data.history(start=sixty_days_ago, end=today, interval="15m")
+    if store is not None:
+        return _fetch_incremental(store, data, ticker_symbol, sixty_days_ago, today, interval)
 
-    if silver.empty:
-        logging.warning("15-minute data is empty. Switching to 1-day interval.")
-        silver = data.history(start=sixty_days_ago, end=today, interval="1d")
+    logging.info(f"Fetching {ticker_symbol} data from {sixty_days_ago.strftime('%Y-%m-%d')} to {today.strftime('%Y-%m-%d')}...")
+
+    # Try fetching intraday data first
+    silver = data.history(start=sixty_days_ago, end=today, interval=interval)
+
+    if silver.empty and interval != "1d":
+        logging.warning(f"{interval} data is empty. Switching to 1-day interval.")
+        interval = "1d"
+        silver = data.history(start=sixty_days_ago, end=today, interval=interval)
 
     if silver.empty:
         logging.error(f"No data found for {ticker_symbol}. It may be delisted or unavailable.")
@@ -81,10 +129,33 @@ def fetch_silver_data():
     # Reset index for proper formatting
     silver.reset_index(inplace=True)
 
-    logging.info(f"Fetched {len(silver)} rows of data using interval: {'15m' if 'Datetime' in silver else '1d'}")
+    logging.info(f"Fetched {len(silver)} rows of data using interval: {interval}")
 
     return silver  # Return as a DataFrame for further processing
 
+
+def _fetch_incremental(store, data, ticker_symbol, sixty_days_ago, today, interval):
+    last_stored = store.last_timestamp(ticker_symbol, interval)
+
+    # Re-fetch the last stored candle too: it may still have been forming when it was stored
+    start = sixty_days_ago
+    if last_stored is not None:
+        start = max(pd.Timestamp(sixty_days_ago).tz_localize(last_stored.tz), last_stored)
+
+    logging.info(f"Fetching {interval} data for {ticker_symbol} from {start} to {today.strftime('%Y-%m-%d %H:%M')}...")
+    silver = data.history(start=start, end=today, interval=interval)
+
+    if not silver.empty:
+        store.write(ticker_symbol, interval, silver)
+
+    stored = store.read(ticker_symbol, interval, start=sixty_days_ago)
+    if stored.empty:
+        logging.warning(f"No stored {interval} data for {ticker_symbol}. Falling back to a full fetch.")
+        return fetch_silver_data(ticker_symbol=ticker_symbol, interval=interval)
+
+    logging.info(f"Loaded {len(stored)} rows of {interval} data from the candle store.")
+    return stored
+
 # Example usage
 
 def load_existing_data(worksheet):
@@ -97,7 +168,11 @@ def load_existing_data(worksheet):
         logging.info("Google Sheet is empty.")
         return data
 
-    data["Datetime"] = pd.to_datetime(data["Datetime"], errors="coerce")
+    datetimes = pd.to_datetime(data["Datetime"], errors="coerce")
+    if not pd.api.types.is_datetime64_any_dtype(datetimes):
+        # Rows on both sides of a DST change carry different UTC offsets
+        datetimes = pd.to_datetime(data["Datetime"], errors="coerce", utc=True)
+    data["Datetime"] = datetimes
 
     # Convert existing Datetime to New York timezone
     if data["Datetime"].dt.tz is None:
@@ -107,16 +182,22 @@ def load_existing_data(worksheet):
 
     return data
 
-def append_new_data(worksheet, new_data):
+def append_new_data(worksheet, new_data, sync_state=None, max_rows=None):
     """
     Appends new data to the Google Sheet and deletes the first 60 rows after appending.
-    """
-    existing = load_existing_data(worksheet)
 
+    With a SheetSyncState, the sheet is not read back: only candles newer than the
+    persisted high-water mark are appended and the sheet is trimmed to `max_rows`.
+    """
     if "Datetime" not in new_data.columns:
         logging.error("New data is missing 'Datetime' column!")
         return
 
+    if sync_state is not None:
+        return sync_new_data(worksheet, new_data, sync_state, max_rows)
+
+    existing = load_existing_data(worksheet)
+
     new_data["Datetime"] = pd.to_datetime(new_data["Datetime"], errors="coerce")
 
     if existing.empty:
@@ -0,0 +1,210 @@
+import os
+import logging
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from silver_data.backtest import (
+    TREND_WINDOW, ewm, _geometric_ewm, rolling_extreme, trend_positions, simulate,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Parameters of identify_trend_signals / calculate_macd that change its BUY/SELL/stop output
+DEFAULT_GRID = {
+    "short_window": [4, 6, 8, 12],
+    "long_window": [13, 17, 26],
+    "signal_window": [5, 9],
+    "buy_support": [1.01, 1.02, 1.03],
+    "sell_resistance": [0.97, 0.98, 0.99],
+    "stop_support": [0.97, 0.98, 0.99],
+    "stop_resistance": [1.02],
+}
+DEFAULT_THRESHOLDS = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0]
+GRID_AXES = list(DEFAULT_GRID)
+
+
+def macd_grid(close, short_windows, long_windows, signal_windows, window=TREND_WINDOW):
+    """
+    Windowed MACD line and signal (see backtest.windowed_macd) for every combination
+    of windows at once. Returns two arrays shaped (signal, short, long, candles).
+    """
+    close = np.asarray(close, dtype=float)
+    lag = window - 1
+    shorts = np.asarray(short_windows, dtype=float)[:, None, None]
+    longs = np.asarray(long_windows, dtype=float)[None, :, None]
+    signals = np.asarray(signal_windows, dtype=float)[:, None, None, None]
+
+    short_ema = np.stack([ewm(close, span) for span in short_windows])[:, None, :]
+    long_ema = np.stack([ewm(close, span) for span in long_windows])[None, :, :]
+    full_macd = short_ema - long_ema  # (short, long, candles)
+    full_signal = np.stack([ewm(full_macd, span) for span in signal_windows])
+
+    short_decay = 1 - 2.0 / (shorts + 1)
+    long_decay = 1 - 2.0 / (longs + 1)
+    signal_decay = 1 - 2.0 / (signals + 1)
+    short_offset = short_ema[..., :-lag] - close[:-lag]
+    long_offset = long_ema[..., :-lag] - close[:-lag]
+
+    shape = full_signal.shape
+    macd_line = np.full(shape, np.nan)
+    macd_signal = np.full(shape, np.nan)
+    macd_line[..., lag:] = full_macd[..., lag:] - short_decay ** lag * short_offset + long_decay ** lag * long_offset
+    macd_signal[..., lag:] = (
+        full_signal[..., lag:]
+        - signal_decay ** lag * (full_signal[..., :-lag] - full_macd[..., :-lag])
+        - _geometric_ewm(short_decay, signals, window) * short_offset
+        + _geometric_ewm(long_decay, signals, window) * long_offset
+    )
+    return macd_line, macd_signal
+
+
+def evaluate_grid(prices, grid, fee_bps=2.0, allow_short=False):
+    """
+    Backtests every combination in `grid` in one broadcast computation.
+
+    `prices` holds Open/High/Low/Close arrays. Parameter axes are laid out as
+    (signal, short, long, buy_support, sell_resistance, stop_support,
+    stop_resistance, candles) and flattened to one row per combination.
+    """
+    close, high, low = prices["Close"], prices["High"], prices["Low"]
+    support = np.round(rolling_extreme(low, 3, np.min), 2)
+    resistance = np.round(rolling_extreme(high, 3, np.max), 2)
+
+    macd_line, macd_signal = macd_grid(close, grid["short_window"], grid["long_window"], grid["signal_window"])
+    bullish = (macd_line > macd_signal)[..., None, None, None, None, :]
+    bearish = (macd_line < macd_signal)[..., None, None, None, None, :]
+
+    def axis(name, position):
+        shape = [1] * 8
+        shape[position] = -1
+        return np.asarray(grid[name], dtype=float).reshape(shape)
+
+    buy_support = axis("buy_support", 3)
+    sell_resistance = axis("sell_resistance", 4)
+    stop_support = axis("stop_support", 5)
+    stop_resistance = axis("stop_resistance", 6)
+
+    shape = np.broadcast_shapes(bullish.shape, buy_support.shape, sell_resistance.shape,
+                                stop_support.shape, stop_resistance.shape)
+    combinations = int(np.prod(shape[:-1]))
+    buy = np.broadcast_to(bullish & (close <= support * buy_support), shape).reshape(combinations, -1)
+    sell = np.broadcast_to(bearish & (close >= resistance * sell_resistance), shape).reshape(combinations, -1)
+
+    position = trend_positions(
+        {"buy": buy, "sell": sell, "nearest_support": support, "nearest_resistance": resistance},
+        close,
+        stop_support=np.broadcast_to(stop_support, shape[:-1] + (1,)).reshape(combinations, 1),
+        stop_resistance=np.broadcast_to(stop_resistance, shape[:-1] + (1,)).reshape(combinations, 1),
+        allow_short=allow_short,
+    )
+    stats = simulate(prices["Open"], close, position, fee_bps)
+
+    params = itertools.product(
+        grid["signal_window"], grid["short_window"], grid["long_window"], grid["buy_support"],
+        grid["sell_resistance"], grid["stop_support"], grid["stop_resistance"],
+    )
+    table = pd.DataFrame(params, columns=[
+        "signal_window", "short_window", "long_window", "buy_support",
+        "sell_resistance", "stop_support", "stop_resistance",
+    ])
+    for key, values in stats.items():
+        table[key] = values
+    # calculate_macd needs a faster short EMA than long EMA
+    return table[table["short_window"] < table["long_window"]][GRID_AXES + list(stats)]
+
+
+def _split_grid(grid):
+    # One task per (signal_window, short_window): each keeps the remaining axes broadcast
+    for signal_window, short_window in itertools.product(grid["signal_window"], grid["short_window"]):
+        yield dict(grid, signal_window=[signal_window], short_window=[short_window])
+
+
+def sweep(data, grid=None, fee_bps=2.0, allow_short=False, rank_by="total_return_pct", max_workers=None):
+    """
+    Evaluates a parameter grid for identify_trend_signals and returns a ranked table.
+
+    The grid is split across worker processes by (signal_window, short_window);
+    within a task every other axis is evaluated by broadcasting.
+    """
+    grid = dict(DEFAULT_GRID, **(grid or {}))
+    prices = {column: data[column].to_numpy(dtype=float) for column in ("Open", "High", "Low", "Close")}
+    tasks = list(_split_grid(grid))
+
+    if max_workers == 1 or len(tasks) == 1:
+        tables = [evaluate_grid(prices, task, fee_bps, allow_short) for task in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            futures = [pool.submit(evaluate_grid, prices, task, fee_bps, allow_short) for task in tasks]
+            tables = [future.result() for future in futures]
+
+    table = pd.concat(tables, ignore_index=True)
+    logging.info(f"Evaluated {len(table)} parameter combinations on {len(data)} candles.")
+    return table.sort_values(rank_by, ascending=False).reset_index(drop=True)
+
+
+def sweep_trend_threshold(data, thresholds=None, horizon=4):
+    """
+    Ranks trend_threshold values by how often the Bullish/Bearish label is followed
+    by a move in the same direction over the next `horizon` candles. The threshold
+    only labels the trend, so it is scored on its own rather than by P&L.
+    """
+    thresholds = np.asarray(thresholds or DEFAULT_THRESHOLDS, dtype=float)[:, None]
+    close = data["Close"].to_numpy(dtype=float)
+    lag = TREND_WINDOW - 1
+
+    change = np.full(len(close), np.nan)
+    change[lag:] = (close[lag:] - close[:-lag]) / close[:-lag] * 100
+    forward = np.full(len(close), np.nan)
+    forward[:-horizon] = np.sign(close[horizon:] - close[:-horizon])
+
+    label = np.where(change > thresholds, 1, np.where(change < -thresholds, -1, 0))
+    scored = (label != 0) & ~np.isnan(forward)
+    hits = (label == forward) & scored
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        table = pd.DataFrame({
+            "trend_threshold": thresholds[:, 0],
+            "labelled_pct": scored.mean(axis=1) * 100,
+            "hit_rate": hits.sum(axis=1) / scored.sum(axis=1),
+        })
+    return table.sort_values("hit_rate", ascending=False).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep identify_trend_signals parameters on stored candles.")
+    parser.add_argument("--store", default="candle_store", help="CandleStore directory")
+    parser.add_argument("--symbol", default="SI=F")
+    parser.add_argument("--interval", default="15m")
+    parser.add_argument("--start", default=None)
+    parser.add_argument("--fee-bps", type=float, default=2.0)
+    parser.add_argument("--allow-short", action="store_true")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    from silver_data.candle_store import CandleStore
+
+    data = CandleStore(args.store).read(args.symbol, args.interval, start=args.start)
+    if data.empty:
+        logging.error(f"No stored candles for {args.symbol} ({args.interval}).")
+        return
+
+    grid = dict(DEFAULT_GRID)
+    if args.allow_short:
+        grid["stop_resistance"] = [1.01, 1.02, 1.03]
+
+    print(sweep(data, grid, args.fee_bps, args.allow_short, max_workers=args.workers).head(args.top).to_string())
+    print()
+    print(sweep_trend_threshold(data).to_string())
+
+
+if __name__ == "__main__":
+    main()
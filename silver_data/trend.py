@@ -9,19 +9,59 @@ def calculate_macd(data, short_window=6, long_window=13, signal_window=5):
     data['MACD_Signal'] = data['MACD_Line'].ewm(span=signal_window, adjust=False).mean()
     return data
 
+TREND_WINDOW = 48  # Last 12-hour trading window (15m interval)
+
+def _ewm(values, span):
+    """
+    pandas ewm(span=span, adjust=False).mean(), step for step, over a short 1-D array.
+    A plain loop over 48 values is cheaper than building a Series.
+    """
+    alpha = 2.0 / (span + 1)
+    old_wt_factor = 1.0 - alpha
+    result = np.empty(len(values))
+    weighted = values[0]
+    result[0] = weighted
+    old_wt = 1.0
+    for i in range(1, len(values)):
+        current = values[i]
+        if weighted == weighted:
+            # A missing value still ages the average, as in pandas with ignore_na=False
+            old_wt *= old_wt_factor
+            if current == current:
+                if weighted != current:
+                    weighted = (old_wt * weighted + alpha * current) / (old_wt + alpha)
+                old_wt = 1.0
+        elif current == current:
+            weighted = current
+        result[i] = weighted
+    return result
+
+def _column(data, name, window):
+    # Works on DataFrames and on CandleRingBuffer windows; slicing a NumPy array is a view
+    values = data[name]
+    values = values.to_numpy() if hasattr(values, "to_numpy") else np.asarray(values)
+    return values[-window:]
+
 def identify_trend_signals(data, trend_threshold=0.4):
-    """Find buy/sell signals with increased frequency by using shorter lookbacks."""
-    data = data.iloc[-48:].copy()  # Last 12-hour trading window (15m interval)
-    data['5_EMA'] = data['Close'].ewm(span=3, adjust=False).mean()  # Faster EMA
-    data = calculate_macd(data)
+    """
+    Find buy/sell signals with increased frequency by using shorter lookbacks.
+
+    `data` may be a DataFrame or a CandleRingBuffer window; only NumPy views of its
+    last 48 candles are read, nothing is copied or added to it.
+    """
+    close = _column(data, 'Close', TREND_WINDOW)
+    high = _column(data, 'High', TREND_WINDOW)
+    low = _column(data, 'Low', TREND_WINDOW)
 
-    price_change_pct = ((data['Close'].iloc[-1] - data['Close'].iloc[0]) / data['Close'].iloc[0]) * 100
-    nearest_support = round(min(data['Low'].iloc[-3:]), 2)  # Last 3 candles' lowest price
-    nearest_resistance = round(max(data['High'].iloc[-3:]), 2)  # Last 3 candles' highest price
-    last_price = data['Close'].iloc[-1]
-    macd_line = data['MACD_Line'].iloc[-1]
-    macd_signal = data['MACD_Signal'].iloc[-1]
-    ema_5 = data['5_EMA'].iloc[-1]
+    ema_5 = _ewm(close, 3)[-1]  # Faster EMA
+    macd_line_values = _ewm(close, 6) - _ewm(close, 13)  # calculate_macd defaults
+    macd_signal = _ewm(macd_line_values, 5)[-1]
+    macd_line = macd_line_values[-1]
+
+    price_change_pct = ((close[-1] - close[0]) / close[0]) * 100
+    nearest_support = round(float(min(low[-3:])), 2)  # Last 3 candles' lowest price
+    nearest_resistance = round(float(max(high[-3:])), 2)  # Last 3 candles' highest price
+    last_price = close[-1]
 
     # Determine trend
     if price_change_pct > trend_threshold:
@@ -31,13 +71,15 @@ def identify_trend_signals(data, trend_threshold=0.4):
     else:
         trend = "Sideways (Range-bound)"
 
-    # ATR for volatility check
-    data['TR'] = np.maximum(data['High'] - data['Low'], 
-                            np.maximum(abs(data['High'] - data['Close'].shift(1)), 
-                                       abs(data['Low'] - data['Close'].shift(1))))
-    data['ATR'] = data['TR'].rolling(window=10).mean()
-    
-    volatility = data['ATR'].iloc[-1]
+    # ATR for volatility check: mean true range of the last 10 candles
+    if len(close) > 10:
+        previous_close = close[-11:-1]
+        true_range = np.maximum(high[-10:] - low[-10:],
+                                np.maximum(abs(high[-10:] - previous_close),
+                                           abs(low[-10:] - previous_close)))
+        volatility = true_range.mean()
+    else:
+        volatility = np.nan
     price_range = nearest_resistance - nearest_support
 
     # More frequent buy/sell conditions
@@ -1,7 +1,11 @@
 import json
 import os
+import hashlib
 import requests
 from dotenv import load_dotenv
+
+from app.services.whatsapp_dispatcher import broadcast
+from app.services.trade_ledger import get_trade_ledger
 \
 # Load environment variables
 load_dotenv()
@@ -11,8 +15,7 @@ PHONE_NUMBER_ID = os.getenv("PHONE_NUMBER_ID")
 VERSION = os.getenv("VERSION")
 FLASK_API_URL = "http://127.0.0.1:8000/get-data"  # Update if hosted
 
-# Store user trade status (Replace with DB in production)
-user_purchases = {}  # Example: {"919876543210": {"bought": True, "price": 75000}
+# User trade status lives in the shared trade ledger (app/services/trade_ledger.py)
 # Should print the number
 
 # --------------------------------------------------------------
@@ -20,7 +23,7 @@ user_purchases = {}  # Example: {"919876543210": {"bought": True, "price": 75000
 # --------------------------------------------------------------
 def fetch_processed_data():
     try:
-        response = requests.get(FLASK_API_URL)
+        response = requests.get(FLASK_API_URL, timeout=10)
         if response.status_code == 200:
             return response.json()
         else:
@@ -53,7 +56,7 @@ def send_message(data):
         "Content-type": "application/json",
         "Authorization": f"Bearer {ACCESS_TOKEN}",
     }
-    response = requests.post(url, data=data, headers=headers)
+    response = requests.post(url, data=data, headers=headers, timeout=10)
 
     if response.status_code == 200:
         print("✅ Message sent!")
@@ -76,7 +79,7 @@ To confirm your sale, send:
 💰 *Sold at <price>* (Example: "Sold at 2550")  
 """
 
-def format_signal_message(data, wa_id):
+def format_market_message(data):
     price_change = data.get("price_change_pct", "N/A")
     price_change = f"{price_change:.2f}%" if isinstance(price_change, (int, float)) else str(price_change)
 
@@ -101,33 +104,86 @@ def format_signal_message(data, wa_id):
 📉 *Short:* {data.get("short_signal", "N/A")}  
 🚪 *Exit:* {data.get("exit_signal", "N/A")}
 """
+    return market_message
 
-    has_bought = wa_id in user_purchases
-    trade_signal = "\n🟢 *Buy Signal Available!* You may want to buy now!" if not has_bought else "\n🔴 *Sell Signal Available!* Consider selling if you haven't already."
+def format_trade_signal(has_bought):
+    return "\n🟢 *Buy Signal Available!* You may want to buy now!" if not has_bought else "\n🔴 *Sell Signal Available!* Consider selling if you haven't already."
+
+def format_signal_message(data, wa_id):
+    return format_market_message(data) + format_trade_signal(wa_id in get_trade_ledger())
 
-    return market_message + trade_signal
+# --------------------------------------------------------------
+# Versioned snapshots: render once per version, send only on change
+# --------------------------------------------------------------
+# Fields of the processed data that appear in the signal message
+MESSAGE_FIELDS = [
+    "trend", "current_price", "price_change_pct", "nearest_support", "nearest_resistance",
+    "macd_line", "macd_signal", "5_EMA", "buy_signal", "sell_signal", "short_signal", "exit_signal",
+]
+
+last_sent_versions = {}  # recipient -> version of the last signal message they received
+rendered_payloads = {}  # version -> per-recipient payload builders, only the latest is kept
+
+def snapshot_version(data):
+    """Hash of the fields the signal message is built from."""
+    fields = {key: data.get(key) for key in MESSAGE_FIELDS}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+def payload_template(text):
+    """Serializes a text message once; returns a function that adds the recipient cheaply."""
+    marker = "\u0000recipient\u0000"
+    prefix, suffix = get_text_message_input(marker, text).split(json.dumps(marker), 1)
+    return lambda recipient: prefix + json.dumps(recipient) + suffix
+
+def rendered_snapshot(data, version):
+    if version not in rendered_payloads:
+        rendered_payloads.clear()
+        market_message = format_market_message(data)
+        rendered_payloads[version] = {
+            has_bought: payload_template(market_message + format_trade_signal(has_bought))
+            for has_bought in (False, True)
+        }
+    return rendered_payloads[version]
 
 # --------------------------------------------------------------
 # Main Execution: Fetch Data, Format & Send Messages
 # --------------------------------------------------------------
-def main_function():
-    processed_data = fetch_processed_data()
+def main_function(processed_data=None):
+    # In-process callers pass the snapshot; standalone runs fetch it from the Flask API
+    if processed_data is None:
+        processed_data = fetch_processed_data()
     
     if processed_data:
-        for recipient in RECIPIENTS_WAID:
-            print(f"📲 Sending message to: {recipient}")
-    
-            # Send introduction message
-            intro_message = format_intro_message()
-            intro_data = get_text_message_input(recipient, intro_message)
-            send_message(intro_data)
-            print("✅ Intro message sent to", recipient)
-
-            # Send actual signal message
-            signal_message = format_signal_message(processed_data, recipient)
-            signal_data = get_text_message_input(recipient, signal_message)
-            send_message(signal_data)
-            print("✅ Signal message sent to", recipient)
+        version = snapshot_version(processed_data)
+        signal_payloads = rendered_snapshot(processed_data, version)
+        intro_payload = payload_template(format_intro_message())
+
+        messages = {}
+        sent_versions = {}
+        open_trades = get_trade_ledger().open_trades()  # One lookup for the whole broadcast
+        for recipient in filter(None, RECIPIENTS_WAID):
+            has_bought = recipient in open_trades
+            recipient_version = f"{version}:{int(has_bought)}"
+            if last_sent_versions.get(recipient) == recipient_version:
+                continue  # Nothing changed since their last message
+
+            # Introduction only the first time, then the actual signal message
+            messages[recipient] = [] if recipient in last_sent_versions else [intro_payload(recipient)]
+            messages[recipient].append(signal_payloads[has_bought](recipient))
+            sent_versions[recipient] = recipient_version
+
+        if not messages:
+            print(f"ℹ️ Snapshot {version} unchanged, nothing to send")
+            return
+
+        print(f"📲 Sending snapshot {version} to {len(messages)} recipients")
+        results = broadcast(messages)
+        for recipient, statuses in results.items():
+            if all(status == 200 for status, _ in statuses):
+                last_sent_versions[recipient] = sent_versions[recipient]
+                print("✅ Signal message sent to", recipient)
+            else:
+                print(f"❌ Error sending to {recipient}: {[status for status, _ in statuses]}")
 
 
 # Ensure the script runs only when executed directly